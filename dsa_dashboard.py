@@ -1,10 +1,11 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import hashlib
 import warnings
 from datetime import datetime, timedelta
 from io import BytesIO
-import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import math
@@ -91,51 +92,96 @@ if 'show_columns' not in st.session_state:
     st.session_state.show_columns = True
 if 'master_report_data' not in st.session_state:
     st.session_state.master_report_data = {}
+if 'files_fingerprint' not in st.session_state:
+    st.session_state.files_fingerprint = None
 
-def clean_mobile_number(mobile):
-    """Clean mobile numbers to ensure consistency"""
-    if pd.isna(mobile):
-        return None
-    mobile_str = str(mobile)
-    mobile_clean = ''.join(filter(str.isdigit, mobile_str))
-    if len(mobile_clean) == 7:
-        return mobile_clean
-    elif len(mobile_clean) > 7:
-        return mobile_clean[-7:]
-    else:
-        return mobile_clean
+def clean_mobile_series(series):
+    """Clean mobile numbers to ensure consistency: digits only, last 7 digits, missing as NA"""
+    digits = series.astype('string[pyarrow]').str.replace(r'\D', '', regex=True).str.slice(-7)
+    return digits.replace('', pd.NA)
 
-def safe_str_access(series):
-    """Safely apply string operations to a series"""
-    if series.dtype == 'object':
-        return series.astype(str).str.strip()
-    else:
-        return series.astype(str).str.strip()
+def hash_dataframe(df):
+    """Cache key over the full frame contents (Streamlit only samples rows of large frames)"""
+    return (df.shape, tuple(map(str, df.columns)), tuple(map(str, df.dtypes)),
+            pd.util.hash_pandas_object(df, index=False).values.tobytes())
 
-def clean_currency_amount(amount):
-    """Clean currency amounts, handling GMD specifically"""
-    if pd.isna(amount):
-        return 0
-    amount_str = str(amount)
-    # Remove GMD symbol, commas, and spaces
-    amount_clean = amount_str.replace('GMD', '').replace(',', '').replace(' ', '').strip()
-    try:
-        return float(amount_clean)
-    except:
-        return 0
+def uploaded_files_fingerprint(files):
+    """Fingerprint the contents of the uploaded files (None for a missing optional file)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for uploaded_file in files:
+        content = uploaded_file.getvalue() if uploaded_file is not None else b''
+        digest.update(len(content).to_bytes(8, 'little'))
+        digest.update(content)
+    return digest.hexdigest()
+
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=10)
+def load_csv(file_bytes):
+    """Parse uploaded CSV bytes with the PyArrow parser into Arrow-backed columns, once per file content"""
+    df = pd.read_csv(BytesIO(file_bytes), engine='pyarrow', dtype_backend='pyarrow')
+    # The PyArrow parser keeps duplicate and blank header names as they are. Re-read those files with the
+    # default parser, which names them "Mobile.1" / "Unnamed: 2", so find_column and the renames stay unambiguous
+    if df.columns.has_duplicates or (df.columns == '').any():
+        df = pd.read_csv(BytesIO(file_bytes), dtype_backend='pyarrow')
+    # ISO timestamps with an offset (e.g. "2024-06-26T10:00:00Z") are read as tz-aware, which Excel cannot store;
+    # keep them as naive UTC like parse_date_series does
+    for col, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.ArrowDtype) and pa.types.is_timestamp(dtype.pyarrow_dtype) and dtype.pyarrow_dtype.tz:
+            df[col] = df[col].dt.tz_convert(None)
+    return df
+
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=10, hash_funcs={pd.DataFrame: hash_dataframe})
+def normalize_ticket_schema(ticket_df):
+    """Fix headerless 29-column ticket exports and name the customer column customer_mobile, once per upload"""
+    ticket_df = ticket_df.rename(columns=lambda col: str(col).strip())
+    
+    # Fix ticket data if needed
+    if ticket_df.shape[1] == 29:
+        ticket_df.columns = [
+            "user_id", "transaction_id", "sub_transaction_id", "entity_name",
+            "full_name", "created_by", "status", "internal_status", "service_name",
+            "product_name", "transaction_type", "amount", "before_balance", "after_balance",
+            "ucp_name", "wallet_name", "pouch_name", "reference", "error_code", "error_message",
+            "vendor_transaction_id", "vendor_response_code", "vendor_message", "slug", "remarks",
+            "created_at", "business_hierarchy", "parent_user_id", "parent_full_name"
+        ]
+    
+    # Look for the customer identifier, preferring the standard column names from the ticket export
+    if "customer_mobile" not in ticket_df.columns:
+        ticket_customer_col = find_column(ticket_df, ["User Identifier", "user_id", "Created By", "created_by", "Customer Mobile", "Mobile"])
+        if ticket_customer_col:
+            ticket_df = ticket_df.rename(columns={ticket_customer_col: "customer_mobile"})
+    return ticket_df
+
+def normalized_value_mask(series, allowed_values, normalize=str.upper):
+    """Mask rows whose stripped, case-normalized value is allowed, normalizing each distinct value once"""
+    codes, uniques = pd.factorize(series)
+    keep = np.array([normalize(str(value).strip()) in allowed_values for value in uniques] + [False])
+    return pd.Series(keep[codes], index=series.index)
+
+def clean_currency_series(series):
+    """Clean currency amounts, handling GMD specifically; unparseable amounts become 0"""
+    amount_clean = series.astype('string[pyarrow]').str.replace(r'GMD|,|\s', '', regex=True)
+    return pd.to_numeric(amount_clean, errors='coerce').fillna(0).astype('float64')
 
 def find_column(df, possible_names):
-    """Find a column in dataframe from list of possible names"""
+    """Find a column in dataframe from list of possible names, falling back to a case-insensitive match"""
+    columns = set(df.columns)
     for name in possible_names:
-        if name in df.columns:
+        if name in columns:
             return name
+
+    # e.g. "MOBILE" or " mobile " for "Mobile"
+    lowered = {}
+    for col in df.columns:
+        lowered.setdefault(str(col).strip().lower(), col)
+    for name in possible_names:
+        col = lowered.get(name.strip().lower())
+        if col is not None:
+            return col
     return None
 
-def parse_date(date_str, date_formats=None):
-    """Parse date string with multiple formats"""
-    if pd.isna(date_str):
-        return None
-    
+def parse_date_series(series, date_formats=None):
+    """Parse date strings with multiple formats; the first format that matches a value wins"""
     if date_formats is None:
         date_formats = [
             '%Y-%m-%d %H:%M:%S',
@@ -149,47 +195,54 @@ def parse_date(date_str, date_formats=None):
             '%Y-%m-%dT%H:%M:%S.%f'
         ]
     
+    # Parse each distinct value once, one format at a time, only trying formats on values still unparsed
+    codes, uniques = pd.factorize(series)
+    values = pd.Series(uniques.astype(str)).str.strip()
+    parsed = np.full(len(values) + 1, np.datetime64('NaT'), dtype='datetime64[ns]')  # last slot for missing values
+    pending = np.ones(len(values), dtype=bool)
+    # A format can only match values with the same separators, so skip the attempts that are bound to fail
+    separators = {sep: values.str.contains(sep, regex=False).to_numpy() for sep in '/:.T'}
     for fmt in date_formats:
-        try:
-            return datetime.strptime(str(date_str).strip(), fmt)
-        except (ValueError, TypeError):
-            continue
+        if not pending.any():
+            break
+        candidates = pending.copy()
+        for sep, has_sep in separators.items():
+            candidates &= has_sep == (sep in fmt)
+        if candidates.any():
+            parsed[:-1][candidates] = pd.to_datetime(values[candidates], format=fmt, errors='coerce').to_numpy()
+            pending = np.isnat(parsed[:-1])
     
-    # Try pandas to_datetime as fallback
-    try:
-        return pd.to_datetime(date_str)
-    except:
-        return None
+    # Try pandas' own parser as fallback for anything left (timezone-aware values are compared in UTC)
+    if pending.any():
+        fallback = pd.to_datetime(values[pending], format='mixed', errors='coerce', utc=True)
+        parsed[:-1][pending] = fallback.dt.tz_localize(None).to_numpy()
+    
+    return pd.Series(parsed[codes], index=series.index)
 
 def filter_by_date(df, date_col, start_date, end_date):
     """Filter dataframe by date range"""
     if df.empty or date_col not in df.columns:
         return df
     
-    df_filtered = df.copy()
-    
     # Try to parse the date column
     try:
-        # Create a new column with parsed dates
-        df_filtered['_parsed_date'] = df_filtered[date_col].apply(lambda x: parse_date(x))
+        parsed_dates = parse_date_series(df[date_col])
+        keep = pd.Series(True, index=df.index)
         
-        # Filter by date range
+        # Filter by date range; unparseable dates never match
         if start_date:
             start_date_dt = datetime.combine(start_date, datetime.min.time())
-            df_filtered = df_filtered[df_filtered['_parsed_date'] >= start_date_dt]
+            keep &= parsed_dates >= start_date_dt
         
         if end_date:
             end_date_dt = datetime.combine(end_date, datetime.max.time())
-            df_filtered = df_filtered[df_filtered['_parsed_date'] <= end_date_dt]
-        
-        # Drop the temporary column
-        df_filtered = df_filtered.drop(columns=['_parsed_date'], errors='ignore')
+            keep &= parsed_dates <= end_date_dt
         
     except Exception as e:
         st.sidebar.warning(f"Could not filter by date: {str(e)}")
         return df
     
-    return df_filtered
+    return df[keep]
 
 def find_date_column(df):
     """Find date column in dataframe"""
@@ -209,12 +262,15 @@ def find_date_column(df):
     
     return None
 
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=4, hash_funcs={pd.DataFrame: hash_dataframe})
 def process_report_1(onboarding_df, ticket_df, conversion_df, deposit_df, scan_df, start_date=None, end_date=None):
     """Process data for Report 1 with date filtering - EXACT FORMAT as sample"""
     try:
-        # Clean column names
-        for df in [onboarding_df, ticket_df, conversion_df, deposit_df, scan_df]:
-            df.columns = [str(col).strip() for col in df.columns]
+        # Clean column names (on new frames, so the cached inputs are never modified)
+        onboarding_df, ticket_df, conversion_df, deposit_df, scan_df = [
+            df.rename(columns=lambda col: str(col).strip())
+            for df in [onboarding_df, ticket_df, conversion_df, deposit_df, scan_df]
+        ]
         
         # Apply date filtering if dates are provided
         if start_date or end_date:
@@ -237,17 +293,6 @@ def process_report_1(onboarding_df, ticket_df, conversion_df, deposit_df, scan_d
             if onboarding_date_col:
                 onboarding_df = filter_by_date(onboarding_df, onboarding_date_col, start_date, end_date)
         
-        # Fix ticket data if needed
-        if ticket_df.shape[1] == 29:
-            ticket_df.columns = [
-                "user_id", "transaction_id", "sub_transaction_id", "entity_name",
-                "full_name", "created_by", "status", "internal_status", "service_name",
-                "product_name", "transaction_type", "amount", "before_balance", "after_balance",
-                "ucp_name", "wallet_name", "pouch_name", "reference", "error_code", "error_message",
-                "vendor_transaction_id", "vendor_response_code", "vendor_message", "slug", "remarks",
-                "created_at", "business_hierarchy", "parent_user_id", "parent_full_name"
-            ]
-        
         # Rename columns for consistency
         name_cols = ["full_name", "Full Name", "Name"]
         name_col = find_column(onboarding_df, name_cols)
@@ -261,14 +306,10 @@ def process_report_1(onboarding_df, ticket_df, conversion_df, deposit_df, scan_d
         dsa_mobile_col = find_column(onboarding_df, ["Customer Referrer Mobile", "dsa_mobile", "Agent Mobile", "Referrer Mobile"])
         if dsa_mobile_col:
             onboarding_df = onboarding_df.rename(columns={dsa_mobile_col: "dsa_mobile"})
-        else:
-            onboarding_df["dsa_mobile"] = "Unknown"
         
         customer_mobile_col = find_column(onboarding_df, ["Mobile", "customer_mobile", "Customer Mobile", "User Mobile"])
         if customer_mobile_col:
             onboarding_df = onboarding_df.rename(columns={customer_mobile_col: "customer_mobile"})
-        else:
-            onboarding_df["customer_mobile"] = "Unknown"
         
         # Clean deposit customer column
         deposit_customer_col = find_column(deposit_df, ['customer_mobile', 'Customer Mobile', 'Mobile', 'User Identifier', 'user_id', 'User ID'])
@@ -279,41 +320,19 @@ def process_report_1(onboarding_df, ticket_df, conversion_df, deposit_df, scan_d
         
         deposit_df = deposit_df.rename(columns={deposit_customer_col: "customer_mobile"})
         
-        # Handle conversion data if provided
+        # Handle conversion data if provided (it is only used when both its columns are present)
+        has_conv = False
         if not conversion_df.empty:
             conversion_dsa_col = find_column(conversion_df, ["Agent Mobile", "dsa_mobile", "DSA Mobile", "Referrer Mobile"])
-            if conversion_dsa_col:
-                conversion_df = conversion_df.rename(columns={conversion_dsa_col: "dsa_mobile"})
-            
             deposit_count_col = find_column(conversion_df, ["Deposit Count", "deposit_count", "Deposits"])
-            if deposit_count_col:
-                conversion_df = conversion_df.rename(columns={deposit_count_col: "deposit_count"})
+            has_conv = conversion_dsa_col is not None and deposit_count_col is not None
+            if has_conv:
+                conversion_df = conversion_df.rename(columns={conversion_dsa_col: "dsa_mobile", deposit_count_col: "deposit_count"})
         
-        # CRITICAL: Clean ticket customer column - Look for customer identifier in ticket data
-        ticket_customer_col = None
-        
-        # First, check if we have the standard column names from your data
-        if "User Identifier" in ticket_df.columns:
-            ticket_df = ticket_df.rename(columns={"User Identifier": "customer_mobile"})
-            ticket_customer_col = "customer_mobile"
-        elif "user_id" in ticket_df.columns:
-            ticket_df = ticket_df.rename(columns={"user_id": "customer_mobile"})
-            ticket_customer_col = "customer_mobile"
-        elif "Created By" in ticket_df.columns:
-            ticket_df = ticket_df.rename(columns={"Created By": "customer_mobile"})
-            ticket_customer_col = "customer_mobile"
-        elif "created_by" in ticket_df.columns:
-            ticket_df = ticket_df.rename(columns={"created_by": "customer_mobile"})
-            ticket_customer_col = "customer_mobile"
-        else:
-            # Try to find any customer column
-            ticket_customer_col = find_column(ticket_df, ["User Identifier", "user_id", "Created By", "created_by", "customer_mobile", "Customer Mobile", "Mobile"])
-            if ticket_customer_col:
-                ticket_df = ticket_df.rename(columns={ticket_customer_col: "customer_mobile"})
-                ticket_customer_col = "customer_mobile"
-            else:
-                st.error(f"No suitable customer column found in Ticket data. Available columns: {list(ticket_df.columns)}")
-                return None
+        # Ticket data arrives normalized at upload time (see normalize_ticket_schema)
+        if "customer_mobile" not in ticket_df.columns:
+            st.error(f"No suitable customer column found in Ticket data. Available columns: {list(ticket_df.columns)}")
+            return None
         
         # CRITICAL: Clean scan customer column
         scan_customer_col = find_column(scan_df, ['Created By', 'Customer Mobile', 'Mobile', 'User Identifier', 'user_id', 'customer_mobile'])
@@ -324,12 +343,17 @@ def process_report_1(onboarding_df, ticket_df, conversion_df, deposit_df, scan_d
         
         scan_df = scan_df.rename(columns={scan_customer_col: "customer_mobile"})
         
-        # Clean mobile numbers
+        # Clean mobile numbers the same way as Report 2, so both reports agree on customer identity
         for df, col in [(onboarding_df, "customer_mobile"), (onboarding_df, "dsa_mobile"),
                         (deposit_df, "customer_mobile"), (ticket_df, "customer_mobile"),
                         (scan_df, "customer_mobile"), (conversion_df, "dsa_mobile")]:
             if col in df.columns:
-                df[col] = safe_str_access(df[col])
+                df[col] = clean_mobile_series(df[col])
+        
+        # Placeholders are set after cleaning, which would turn them into NA (they have no digits)
+        for col in ["dsa_mobile", "customer_mobile"]:
+            if col not in onboarding_df.columns:
+                onboarding_df[col] = "Unknown"
         
         # CRITICAL: Identify deposit transactions (CR - Credit/Customer Deposits)
         deposit_tx_type_col = find_column(deposit_df, ["transaction_type", "Transaction Type", "TransactionType", "Type"])
@@ -338,59 +362,53 @@ def process_report_1(onboarding_df, ticket_df, conversion_df, deposit_df, scan_d
         
         # Filter for only deposit transactions (CR)
         if "transaction_type" in deposit_df.columns:
-            deposit_df["transaction_type"] = safe_str_access(deposit_df["transaction_type"])
             # Filter for CR (Credit/Deposit) transactions only
             original_deposit_count = len(deposit_df)
-            deposit_df = deposit_df[deposit_df["transaction_type"].str.upper().isin(["CR", "DEPOSIT", "C"])]
+            deposit_df = deposit_df[normalized_value_mask(deposit_df["transaction_type"], {"CR", "DEPOSIT", "C"})]
             if original_deposit_count > 0:
                 st.info(f"Filtered deposit data: {original_deposit_count} → {len(deposit_df)} CR transactions")
         
         # CRITICAL: Clean and filter ticket data
         # 1. Filter for Customer entity only (not Merchant)
         if "Entity Name" in ticket_df.columns:
-            ticket_df["Entity Name"] = safe_str_access(ticket_df["Entity Name"])
             original_ticket_count = len(ticket_df)
-            ticket_df = ticket_df[ticket_df["Entity Name"].str.lower() == "customer"]
+            ticket_df = ticket_df[normalized_value_mask(ticket_df["Entity Name"], {"customer"}, str.lower)]
             st.info(f"Filtered ticket data (Customer only): {original_ticket_count} → {len(ticket_df)}")
         
         # 2. Filter for DR transactions only (ticket purchases)
         if "Transaction Type" in ticket_df.columns:
-            ticket_df["Transaction Type"] = safe_str_access(ticket_df["Transaction Type"])
             original_ticket_count = len(ticket_df)
-            ticket_df = ticket_df[ticket_df["Transaction Type"].str.upper().isin(["DR", "DEBIT", "D"])]
+            ticket_df = ticket_df[normalized_value_mask(ticket_df["Transaction Type"], {"DR", "DEBIT", "D"})]
             st.info(f"Filtered ticket data (DR only): {original_ticket_count} → {len(ticket_df)}")
         elif "transaction_type" in ticket_df.columns:
-            ticket_df["transaction_type"] = safe_str_access(ticket_df["transaction_type"])
             original_ticket_count = len(ticket_df)
-            ticket_df = ticket_df[ticket_df["transaction_type"].str.upper().isin(["DR", "DEBIT", "D"])]
+            ticket_df = ticket_df[normalized_value_mask(ticket_df["transaction_type"], {"DR", "DEBIT", "D"})]
             st.info(f"Filtered ticket data (DR only): {original_ticket_count} → {len(ticket_df)}")
         
         # CRITICAL: Clean numeric columns for ticket data
         if "Amount" in ticket_df.columns:
-            ticket_df["ticket_amount"] = ticket_df["Amount"].apply(clean_currency_amount)
+            ticket_df["ticket_amount"] = clean_currency_series(ticket_df["Amount"])
         elif "amount" in ticket_df.columns:
-            ticket_df["ticket_amount"] = ticket_df["amount"].apply(clean_currency_amount)
+            ticket_df["ticket_amount"] = clean_currency_series(ticket_df["amount"])
         else:
             ticket_df["ticket_amount"] = 0
         
         # CRITICAL: Clean scan data
         if "Transaction Type" in scan_df.columns:
-            scan_df["Transaction Type"] = safe_str_access(scan_df["Transaction Type"])
             original_scan_count = len(scan_df)
             # Filter for DR transactions only (scan to send)
-            scan_df = scan_df[scan_df["Transaction Type"].str.upper().isin(["DR", "DEBIT", "D"])]
+            scan_df = scan_df[normalized_value_mask(scan_df["Transaction Type"], {"DR", "DEBIT", "D"})]
             st.info(f"Filtered scan data (DR only): {original_scan_count} → {len(scan_df)}")
         elif "transaction_type" in scan_df.columns:
-            scan_df["transaction_type"] = safe_str_access(scan_df["transaction_type"])
             original_scan_count = len(scan_df)
-            scan_df = scan_df[scan_df["transaction_type"].str.upper().isin(["DR", "DEBIT", "D"])]
+            scan_df = scan_df[normalized_value_mask(scan_df["transaction_type"], {"DR", "DEBIT", "D"})]
             st.info(f"Filtered scan data (DR only): {original_scan_count} → {len(scan_df)}")
         
         # Clean numeric columns for scan data
         if "Amount" in scan_df.columns:
-            scan_df["scan_amount"] = scan_df["Amount"].apply(clean_currency_amount)
+            scan_df["scan_amount"] = clean_currency_series(scan_df["Amount"])
         elif "amount" in scan_df.columns:
-            scan_df["scan_amount"] = scan_df["amount"].apply(clean_currency_amount)
+            scan_df["scan_amount"] = clean_currency_series(scan_df["amount"])
         else:
             scan_df["scan_amount"] = 0
         
@@ -408,59 +426,64 @@ def process_report_1(onboarding_df, ticket_df, conversion_df, deposit_df, scan_d
         if original_onboarded_count > 0:
             st.info(f"Valid onboarded customers with DSA: {original_onboarded_count} → {len(onboarding_df)}")
         
+        # Share one categorical dtype for each mobile key so the groupbys and merges below
+        # work on integer codes instead of hashing strings
+        customer_mobiles = pd.concat(
+            [df["customer_mobile"] for df in (onboarding_df, ticket_df, deposit_df, scan_df)], ignore_index=True
+        ).dropna().drop_duplicates().sort_values()
+        customer_mobile_dtype = pd.CategoricalDtype(customer_mobiles.astype(object))
+        onboarding_df = onboarding_df.assign(
+            customer_mobile=onboarding_df["customer_mobile"].astype(customer_mobile_dtype),
+            dsa_mobile=onboarding_df["dsa_mobile"].astype(object).astype("category")
+        )
+        ticket_df = ticket_df.assign(customer_mobile=ticket_df["customer_mobile"].astype(customer_mobile_dtype))
+        deposit_df = deposit_df.assign(customer_mobile=deposit_df["customer_mobile"].astype(customer_mobile_dtype))
+        scan_df = scan_df.assign(customer_mobile=scan_df["customer_mobile"].astype(customer_mobile_dtype))
+        
         # CRITICAL: Aggregate ticket data - only count customers with POSITIVE ticket amounts
         if not ticket_df.empty:
             # Group by customer and sum ticket amounts
-            ticket_agg = ticket_df.groupby("customer_mobile").agg(
+            ticket_agg = ticket_df.assign(
+                _positive=ticket_df["ticket_amount"] > 0
+            ).groupby("customer_mobile", observed=True, sort=False).agg(
                 ticket_amount=("ticket_amount", "sum"),
-                ticket_count=("ticket_amount", lambda x: (x > 0).sum())
+                ticket_count=("_positive", "sum")
             ).reset_index()
             # Only mark as bought_ticket if they have a positive ticket amount
-            ticket_agg["bought_ticket"] = (ticket_agg["ticket_amount"] > 0).astype(int)
+            ticket_agg["bought_ticket"] = (ticket_agg["ticket_amount"] > 0).astype("int8")
             
         else:
             ticket_agg = pd.DataFrame(columns=["customer_mobile", "ticket_amount", "ticket_count", "bought_ticket"])
         
         # CRITICAL: Aggregate scan data - only count customers with POSITIVE scan amounts
         if not scan_df.empty:
-            scan_summary = scan_df.groupby("customer_mobile").agg(
+            scan_summary = scan_df.assign(
+                _positive=scan_df["scan_amount"] > 0
+            ).groupby("customer_mobile", observed=True, sort=False).agg(
                 scan_amount=("scan_amount", "sum"),
-                scan_count=("scan_amount", "count")
+                scan_count=("_positive", "sum")
             ).reset_index()
             # Only mark as did_scan if they have a positive scan amount
-            scan_summary["did_scan"] = (scan_summary["scan_amount"] > 0).astype(int)
+            scan_summary["did_scan"] = (scan_summary["scan_amount"] > 0).astype("int8")
             
         else:
             scan_summary = pd.DataFrame(columns=["customer_mobile", "scan_amount", "scan_count", "did_scan"])
         
-        # Get unique depositors from CR transactions
-        unique_depositors = deposit_df[["customer_mobile"]].drop_duplicates().assign(deposited=1)
-        
         # Create onboarded customers table
         onboarded_customers = onboarding_df[["dsa_mobile", "customer_mobile", "full_name"]].copy()
         onboarded_customers = onboarded_customers.drop_duplicates(subset=["customer_mobile"])
         
-        # Merge all data
-        onboarded_customers = onboarded_customers.merge(
-            ticket_agg[["customer_mobile", "bought_ticket", "ticket_amount"]],
-            on="customer_mobile", 
-            how="left"
-        ).merge(
-            scan_summary[["customer_mobile", "did_scan", "scan_amount"]],
-            on="customer_mobile", 
-            how="left"
-        ).merge(
-            unique_depositors,
-            on="customer_mobile", 
-            how="left"
-        )
-        
-        # Fill NaN values
-        onboarded_customers["bought_ticket"] = onboarded_customers["bought_ticket"].fillna(0).astype(int)
-        onboarded_customers["did_scan"] = onboarded_customers["did_scan"].fillna(0).astype(int)
-        onboarded_customers["deposited"] = onboarded_customers["deposited"].fillna(0).astype(int)
-        onboarded_customers["ticket_amount"] = onboarded_customers["ticket_amount"].fillna(0)
-        onboarded_customers["scan_amount"] = onboarded_customers["scan_amount"].fillna(0)
+        # Look up ticket, scan and deposit activity per customer (customer_mobile is unique here).
+        # Map the plain mobiles: mapping the categorical maps its categories and can return a Categorical
+        customers = onboarded_customers["customer_mobile"].astype(object)
+        ticket_lookup = ticket_agg.set_index("customer_mobile")
+        scan_lookup = scan_summary.set_index("customer_mobile")
+        onboarded_customers["bought_ticket"] = customers.map(ticket_lookup["bought_ticket"]).fillna(0).astype("int8")
+        onboarded_customers["ticket_amount"] = customers.map(ticket_lookup["ticket_amount"]).fillna(0).astype("float64")
+        onboarded_customers["did_scan"] = customers.map(scan_lookup["did_scan"]).fillna(0).astype("int8")
+        onboarded_customers["scan_amount"] = customers.map(scan_lookup["scan_amount"]).fillna(0).astype("float64")
+        # Unique depositors from CR transactions
+        onboarded_customers["deposited"] = customers.isin(deposit_df["customer_mobile"].dropna()).astype("int8")
         
         # CRITICAL: Create qualified customers table - EXACTLY as in sample
         # A customer qualifies if:
@@ -469,83 +492,39 @@ def process_report_1(onboarding_df, ticket_df, conversion_df, deposit_df, scan_d
         # 3. They either bought a ticket (bought_ticket == 1 AND ticket_amount > 0) 
         #    OR did a scan (did_scan == 1 AND scan_amount > 0)
         
-        # First filter: deposited = 1
-        deposited_customers = onboarded_customers[onboarded_customers["deposited"] == 1].copy()
-        
-        # Second filter: either bought ticket OR did scan
-        qualified_customers = deposited_customers[
-            (deposited_customers["bought_ticket"] == 1) | 
-            (deposited_customers["did_scan"] == 1)
-        ].copy()
-        
-        # Third filter: ensure positive amounts
-        qualified_customers = qualified_customers[
-            (qualified_customers["ticket_amount"] > 0) | 
-            (qualified_customers["scan_amount"] > 0)
+        # All filters are applied as one mask, without copying the intermediate frames
+        qualified_customers = onboarded_customers[
+            # First filter: deposited = 1
+            (onboarded_customers["deposited"] == 1) &
+            # Second filter: either bought ticket OR did scan
+            ((onboarded_customers["bought_ticket"] == 1) | (onboarded_customers["did_scan"] == 1)) &
+            # Third filter: ensure positive amounts
+            ((onboarded_customers["ticket_amount"] > 0) | (onboarded_customers["scan_amount"] > 0)) &
+            # CRITICAL: Additional validation - ensure DSA mobile is not empty
+            (onboarded_customers["dsa_mobile"].astype(str).str.strip() != "")
         ]
         
-        # CRITICAL: Additional validation - ensure DSA mobile is not empty
-        qualified_customers = qualified_customers[qualified_customers["dsa_mobile"].astype(str).str.strip() != ""]
-        
         # Sort and add running counts - EXACT FORMAT as sample
         if not qualified_customers.empty:
             qualified_customers = qualified_customers.sort_values(["dsa_mobile", "customer_mobile"])
             
-            # Create a clean table with the exact format from sample
-            result_rows = []
-            
-            for dsa_mobile in qualified_customers["dsa_mobile"].unique():
-                dsa_customers = qualified_customers[qualified_customers["dsa_mobile"] == dsa_mobile].copy()
-                dsa_customers = dsa_customers.sort_values("customer_mobile")
-                
-                # Add summary columns only for first customer of each DSA
-                customer_count = len(dsa_customers)
-                deposit_count = dsa_customers["deposited"].sum()
-                ticket_count = dsa_customers["bought_ticket"].sum()
-                scan_count = dsa_customers["did_scan"].sum()
-                payment = customer_count * 40  # GMD 40 per customer
-                
-                # First customer row with summary
-                first_customer = dsa_customers.iloc[0].copy()
-                first_row = {
-                    'dsa_mobile': dsa_mobile,
-                    'customer_mobile': first_customer['customer_mobile'],
-                    'full_name': first_customer['full_name'],
-                    'bought_ticket': first_customer['bought_ticket'],
-                    'ticket_amount': first_customer['ticket_amount'],
-                    'did_scan': first_customer['did_scan'],
-                    'scan_amount': first_customer['scan_amount'],
-                    'deposited': first_customer['deposited'],
-                    'Customer Count': customer_count,
-                    'Deposit Count': deposit_count,
-                    'Ticket Count': ticket_count,
-                    'Scan To Send Count': scan_count,
-                    'Payment (Customer Count *40)': payment
-                }
-                result_rows.append(first_row)
-                
-                # Remaining customer rows without summary
-                for idx in range(1, len(dsa_customers)):
-                    customer = dsa_customers.iloc[idx]
-                    row = {
-                        'dsa_mobile': dsa_mobile,
-                        'customer_mobile': customer['customer_mobile'],
-                        'full_name': customer['full_name'],
-                        'bought_ticket': customer['bought_ticket'],
-                        'ticket_amount': customer['ticket_amount'],
-                        'did_scan': customer['did_scan'],
-                        'scan_amount': customer['scan_amount'],
-                        'deposited': customer['deposited'],
-                        'Customer Count': '',
-                        'Deposit Count': '',
-                        'Ticket Count': '',
-                        'Scan To Send Count': '',
-                        'Payment (Customer Count *40)': ''
-                    }
-                    result_rows.append(row)
+            # Summary columns for each DSA, shown on the first customer row only
+            dsa_codes, _ = pd.factorize(qualified_customers["dsa_mobile"])
+            customer_counts = np.bincount(dsa_codes)
+            summary = pd.DataFrame({
+                'Customer Count': customer_counts[dsa_codes],
+                'Deposit Count': np.bincount(dsa_codes, weights=qualified_customers["deposited"]).astype(int)[dsa_codes],
+                'Ticket Count': np.bincount(dsa_codes, weights=qualified_customers["bought_ticket"]).astype(int)[dsa_codes],
+                'Scan To Send Count': np.bincount(dsa_codes, weights=qualified_customers["did_scan"]).astype(int)[dsa_codes],
+                'Payment (Customer Count *40)': customer_counts[dsa_codes] * 40  # GMD 40 per customer
+            }, index=qualified_customers.index)
+            # Rows are sorted by DSA, so a DSA's first row is where its code changes
+            is_first = pd.Series(np.r_[True, dsa_codes[1:] != dsa_codes[:-1]], index=qualified_customers.index)
             
             # Create the final qualified customers dataframe
-            qualified_customers_final = pd.DataFrame(result_rows)
+            qualified_customers_final = pd.concat(
+                [qualified_customers, summary.where(is_first).astype('Int32')], axis=1
+            ).reset_index(drop=True)
             
             # Ensure proper column order
             columns_order = [
@@ -564,7 +543,7 @@ def process_report_1(onboarding_df, ticket_df, conversion_df, deposit_df, scan_d
             ])
         
         # Create DSA summary
-        dsa_summary_all = onboarded_customers.groupby("dsa_mobile").agg(
+        dsa_summary_all = onboarded_customers.groupby("dsa_mobile", observed=True).agg(
             Customer_Count=("customer_mobile", "count"),
             Customers_who_deposited=("deposited", "sum"),
             Customers_who_bought_ticket=("bought_ticket", "sum"),
@@ -572,25 +551,28 @@ def process_report_1(onboarding_df, ticket_df, conversion_df, deposit_df, scan_d
             Total_Ticket_Amount=("ticket_amount", "sum"),
             Total_Scan_Amount=("scan_amount", "sum")
         ).reset_index()
+        # Per-DSA counts fit comfortably in int32; amounts stay float64 so GMD totals keep full precision
+        count_cols = ["Customer_Count", "Customers_who_deposited", "Customers_who_bought_ticket", "Customers_who_did_scan"]
+        dsa_summary_all[count_cols] = dsa_summary_all[count_cols].astype("int32")
         
-        if not conversion_df.empty and "dsa_mobile" in conversion_df.columns:
-            dsa_summary_all = dsa_summary_all.merge(
-                conversion_df[["dsa_mobile", "deposit_count"]].drop_duplicates(),
-                on="dsa_mobile",
-                how="left"
-            )
+        if has_conv:
+            # One deposit count per DSA; a repeated DSA keeps its last row instead of duplicating the summary row
+            deposit_map = dict(zip(conversion_df["dsa_mobile"], conversion_df["deposit_count"]))
+            dsa_summary_all["deposit_count"] = dsa_summary_all["dsa_mobile"].astype(object).map(deposit_map)
         
         # Calculate conversion rates
-        dsa_summary_all["Ticket_Conversion_Rate"] = (dsa_summary_all["Customers_who_bought_ticket"] / 
-                                                     dsa_summary_all["Customer_Count"].replace(0, 1) * 100).round(2)
-        dsa_summary_all["Scan_Conversion_Rate"] = (dsa_summary_all["Customers_who_did_scan"] / 
-                                                   dsa_summary_all["Customer_Count"].replace(0, 1) * 100).round(2)
-        dsa_summary_all["Deposit_Conversion_Rate"] = (dsa_summary_all["Customers_who_deposited"] / 
-                                                      dsa_summary_all["Customer_Count"].replace(0, 1) * 100).round(2)
+        customer_counts = dsa_summary_all["Customer_Count"].to_numpy()
+        safe_counts = np.where(customer_counts == 0, 1, customer_counts)
+        for count_col, rate_col in [("Customers_who_bought_ticket", "Ticket_Conversion_Rate"),
+                                    ("Customers_who_did_scan", "Scan_Conversion_Rate"),
+                                    ("Customers_who_deposited", "Deposit_Conversion_Rate")]:
+            dsa_summary_all[rate_col] = np.round(dsa_summary_all[count_col].to_numpy() / safe_counts * 100, 2)
         
         return {
             "qualified_customers": qualified_customers_final,
             "dsa_summary": dsa_summary_all,
+            # DSA choices for the sidebar filter, computed once instead of on every rerun
+            "dsa_list": dsa_summary_all["dsa_mobile"].astype(str).tolist(),
             "onboarded_customers": onboarded_customers,
             "ticket_details": ticket_df,
             "scan_details": scan_df,
@@ -604,16 +586,20 @@ def process_report_1(onboarding_df, ticket_df, conversion_df, deposit_df, scan_d
         st.error(f"Traceback: {traceback.format_exc()}")
         return None
 
+# Report 2 match statuses, plus '' for the blank separator rows
+MATCH_STATUS_DTYPE = pd.CategoricalDtype(['NO ONBOARDING', 'MATCH', 'MISMATCH', ''])
+
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=4, hash_funcs={pd.DataFrame: hash_dataframe})
 def process_report_2(onboarding_df, deposit_df, ticket_df, scan_df, start_date=None, end_date=None, report_1_qualified_customers=None):
     """Process data for Report 2 - ONLY NO ONBOARDING customers with exact sample format"""
     try:
         st.info("Processing Report 2: Analyzing NO ONBOARDING customers...")
         
-        # Create copies to avoid modifying original data
-        onboarding_df = onboarding_df.copy()
-        deposit_df = deposit_df.copy()
-        ticket_df = ticket_df.copy()
-        scan_df = scan_df.copy()
+        # Shallow copies: columns are only added or replaced below, never written in place,
+        # so the cached inputs stay untouched without duplicating their data
+        onboarding_df, deposit_df, ticket_df, scan_df = [
+            df.copy(deep=False) for df in [onboarding_df, deposit_df, ticket_df, scan_df]
+        ]
         
         # Clean column names consistently
         for df in [onboarding_df, deposit_df, ticket_df, scan_df]:
@@ -718,23 +704,8 @@ def process_report_2(onboarding_df, deposit_df, ticket_df, scan_df, start_date=N
         
         # 2. CLEAN AND PREPARE DEPOSIT DATA
         # Clean mobile numbers in deposit data
-        def clean_mobile_for_report2(mobile):
-            """Enhanced mobile number cleaning for Report 2"""
-            if pd.isna(mobile):
-                return None
-            mobile_str = str(mobile)
-            # Remove all non-digit characters
-            mobile_clean = ''.join(filter(str.isdigit, mobile_str))
-            # Handle various formats
-            if mobile_clean.startswith('220'):
-                mobile_clean = mobile_clean[3:]  # Remove country code
-            if len(mobile_clean) >= 7:
-                return mobile_clean[-7:]  # Take last 7 digits
-            return mobile_clean if mobile_clean else None
-        
-        # Apply cleaning to deposit data
-        deposit_df['customer_mobile_clean'] = deposit_df[deposit_customer_col].apply(clean_mobile_for_report2)
-        deposit_df['dsa_mobile_clean'] = deposit_df[deposit_dsa_col].apply(clean_mobile_for_report2)
+        deposit_df['customer_mobile_clean'] = clean_mobile_series(deposit_df[deposit_customer_col])
+        deposit_df['dsa_mobile_clean'] = clean_mobile_series(deposit_df[deposit_dsa_col])
         
         # Filter out rows where customer or DSA mobile is missing/empty
         original_deposit_count = len(deposit_df)
@@ -744,10 +715,9 @@ def process_report_2(onboarding_df, deposit_df, ticket_df, scan_df, start_date=N
         
         # Filter for CR (deposit) transactions only if transaction type column exists
         if deposit_tx_type_col and deposit_tx_type_col in deposit_df.columns:
-            deposit_df[deposit_tx_type_col] = deposit_df[deposit_tx_type_col].astype(str).str.strip().str.upper()
             original_count = len(deposit_df)
             # Include more variations of deposit transactions
-            deposit_df = deposit_df[deposit_df[deposit_tx_type_col].isin(['CR', 'DEPOSIT', 'C', 'CREDIT', 'D'])]
+            deposit_df = deposit_df[normalized_value_mask(deposit_df[deposit_tx_type_col], {'CR', 'DEPOSIT', 'C', 'CREDIT', 'D'})]
             st.info(f"Deposit data filtered to CR transactions: {original_count} → {len(deposit_df)} rows")
         
         # 3. GET ONBOARDING MAPPING
@@ -780,19 +750,17 @@ def process_report_2(onboarding_df, deposit_df, ticket_df, scan_df, start_date=N
         onboarding_map = {}
         if onboarding_customer_col and onboarding_dsa_col:
             # Clean mobile numbers in onboarding data
-            onboarding_df['customer_mobile_clean'] = onboarding_df[onboarding_customer_col].apply(clean_mobile_for_report2)
-            onboarding_df['dsa_mobile_clean'] = onboarding_df[onboarding_dsa_col].apply(clean_mobile_for_report2)
+            onboarding_df['customer_mobile_clean'] = clean_mobile_series(onboarding_df[onboarding_customer_col])
+            onboarding_df['dsa_mobile_clean'] = clean_mobile_series(onboarding_df[onboarding_dsa_col])
             
             # Create mapping of customer → DSA who onboarded them
             valid_onboarding = onboarding_df.dropna(subset=['customer_mobile_clean', 'dsa_mobile_clean'])
             valid_onboarding = valid_onboarding[(valid_onboarding['customer_mobile_clean'] != '') & 
                                                 (valid_onboarding['dsa_mobile_clean'] != '')]
             
-            for _, row in valid_onboarding.iterrows():
-                customer_mobile = row['customer_mobile_clean']
-                dsa_mobile = row['dsa_mobile_clean']
-                if customer_mobile and dsa_mobile:
-                    onboarding_map[customer_mobile] = dsa_mobile
+            # Later rows win, as with repeated dict assignment
+            valid_onboarding = valid_onboarding.drop_duplicates(subset=['customer_mobile_clean'], keep='last')
+            onboarding_map = valid_onboarding.set_index('customer_mobile_clean')['dsa_mobile_clean'].to_dict()
             
             st.info(f"Found {len(onboarding_map)} customer-DSA mappings in onboarding data")
         else:
@@ -801,12 +769,9 @@ def process_report_2(onboarding_df, deposit_df, ticket_df, scan_df, start_date=N
         # 4. GET REPORT 1 QUALIFIED CUSTOMERS (to exclude them from Report 2)
         report1_excluded_customers = set()
         if report_1_qualified_customers is not None and not report_1_qualified_customers.empty:
-            # Get all unique customer mobiles from Report 1
-            report1_customers = set(report_1_qualified_customers['customer_mobile'].astype(str).str.strip().unique())
-            # Clean them for comparison
-            report1_excluded_customers = {clean_mobile_for_report2(mobile) for mobile in report1_customers}
-            # Remove None values
-            report1_excluded_customers = {mobile for mobile in report1_excluded_customers if mobile}
+            # Get all unique customer mobiles from Report 1, cleaned for comparison
+            report1_customers = pd.Series(report_1_qualified_customers['customer_mobile'].unique())
+            report1_excluded_customers = set(clean_mobile_series(report1_customers).dropna())
             st.info(f"Will exclude {len(report1_excluded_customers)} customers who are already in Report 1")
         
         # 5. GET CUSTOMER NAMES FROM ALL SOURCES
@@ -821,11 +786,11 @@ def process_report_2(onboarding_df, deposit_df, ticket_df, scan_df, start_date=N
                 break
         
         if deposit_name_col:
-            for _, row in deposit_df.iterrows():
-                customer_mobile = row['customer_mobile_clean']
-                name = row.get(deposit_name_col)
-                if customer_mobile and pd.notna(name) and str(name).strip():
-                    customer_names[customer_mobile] = str(name).strip()
+            named_deposits = deposit_df[['customer_mobile_clean', deposit_name_col]].dropna()
+            names = named_deposits[deposit_name_col].astype(str).str.strip()
+            named_deposits = named_deposits.assign(name_clean=names)[names != '']
+            named_deposits = named_deposits.drop_duplicates(subset=['customer_mobile_clean'], keep='last')
+            customer_names = named_deposits.set_index('customer_mobile_clean')['name_clean'].to_dict()
         
         # 6. IDENTIFY CUSTOMERS WITH DEPOSIT + TICKET/SCAN ACTIVITY
         # Find ticket and scan customer columns
@@ -861,212 +826,132 @@ def process_report_2(onboarding_df, deposit_df, ticket_df, scan_df, start_date=N
         
         # Clean mobile numbers in ticket and scan data
         if ticket_customer_col:
-            ticket_df['customer_mobile_clean'] = ticket_df[ticket_customer_col].apply(clean_mobile_for_report2)
+            ticket_df['customer_mobile_clean'] = clean_mobile_series(ticket_df[ticket_customer_col])
             # Filter ticket data for DR transactions
             ticket_tx_col = find_column(ticket_df, ['transaction_type', 'Transaction Type'])
             if ticket_tx_col:
-                ticket_df[ticket_tx_col] = ticket_df[ticket_tx_col].astype(str).str.strip().str.upper()
                 # Include more variations of debit transactions
-                ticket_df = ticket_df[ticket_df[ticket_tx_col].isin(['DR', 'DEBIT', 'D', 'CR'])]
+                ticket_df = ticket_df[normalized_value_mask(ticket_df[ticket_tx_col], {'DR', 'DEBIT', 'D', 'CR'})]
                 st.info(f"Ticket data filtered to {len(ticket_df)} DR transactions")
         
         if scan_customer_col:
-            scan_df['customer_mobile_clean'] = scan_df[scan_customer_col].apply(clean_mobile_for_report2)
+            scan_df['customer_mobile_clean'] = clean_mobile_series(scan_df[scan_customer_col])
             # Filter scan data for DR transactions
             scan_tx_col = find_column(scan_df, ['transaction_type', 'Transaction Type'])
             if scan_tx_col:
-                scan_df[scan_tx_col] = scan_df[scan_tx_col].astype(str).str.strip().str.upper()
                 # Include more variations of debit transactions
-                scan_df = scan_df[scan_df[scan_tx_col].isin(['DR', 'DEBIT', 'D', 'CR'])]
+                scan_df = scan_df[normalized_value_mask(scan_df[scan_tx_col], {'DR', 'DEBIT', 'D', 'CR'})]
                 st.info(f"Scan data filtered to {len(scan_df)} DR transactions")
         
         # 7. CREATE DSA-CUSTOMER ANALYSIS
-        dsa_customers = {}
-        
-        # Process each deposit to identify DSA-customer relationships
-        for _, row in deposit_df.iterrows():
-            customer_mobile = row['customer_mobile_clean']
-            dsa_mobile = row['dsa_mobile_clean']
-            
-            # Skip if customer or DSA is missing, or if they're the same
-            if not customer_mobile or not dsa_mobile or customer_mobile == dsa_mobile:
-                continue
-            
-            # Skip if customer is already in Report 1
-            if customer_mobile in report1_excluded_customers:
-                continue
-            
-            # Initialize DSA entry if not exists
-            if dsa_mobile not in dsa_customers:
-                dsa_customers[dsa_mobile] = {}
-            
-            # Initialize customer entry if not exists
-            if customer_mobile not in dsa_customers[dsa_mobile]:
-                dsa_customers[dsa_mobile][customer_mobile] = {
-                    'full_name': customer_names.get(customer_mobile, 'Unknown'),
-                    'deposit_count': 0,
-                    'bought_ticket': 0,
-                    'did_scan': 0,
-                    'onboarded_by': onboarding_map.get(customer_mobile, 'NOT ONBOARDED'),
-                    'match_status': 'NO ONBOARDING' if customer_mobile not in onboarding_map else 'ONBOARDED'
-                }
-            
-            # Increment deposit count
-            dsa_customers[dsa_mobile][customer_mobile]['deposit_count'] += 1
+        # One row per (DSA, customer) pair, skipping self-deposits and customers already in Report 1
+        deposit_pairs = deposit_df.loc[
+            (deposit_df['customer_mobile_clean'] != deposit_df['dsa_mobile_clean']) &
+            ~deposit_df['customer_mobile_clean'].isin(list(report1_excluded_customers)),
+            ['dsa_mobile_clean', 'customer_mobile_clean']
+        ]
+        dsa_customers = (
+            deposit_pairs.groupby(['dsa_mobile_clean', 'customer_mobile_clean'], sort=False)
+            .size()
+            .reset_index(name='deposit_count')
+            .rename(columns={'dsa_mobile_clean': 'dsa_mobile', 'customer_mobile_clean': 'customer_mobile'})
+        )
+        dsa_customers['deposit_count'] = dsa_customers['deposit_count'].astype('int32')
+        dsa_customers['full_name'] = dsa_customers['customer_mobile'].map(customer_names).fillna('Unknown')
+        dsa_customers['onboarded_by'] = dsa_customers['customer_mobile'].map(onboarding_map).fillna('NOT ONBOARDED')
+        dsa_customers['bought_ticket'] = 0
+        dsa_customers['did_scan'] = 0
         
-        st.info(f"Found {len(dsa_customers)} DSAs with {sum(len(customers) for customers in dsa_customers.values())} unique customers in deposit data (excluding Report 1 customers)")
+        st.info(f"Found {dsa_customers['dsa_mobile'].nunique()} DSAs with {len(dsa_customers)} unique customers in deposit data (excluding Report 1 customers)")
         
         # 8. CHECK TICKET PURCHASES
         if ticket_customer_col and not ticket_df.empty:
             ticket_df = ticket_df.dropna(subset=['customer_mobile_clean'])
-            ticket_customers = set(ticket_df['customer_mobile_clean'].unique())
-            
-            for dsa_mobile, customers in dsa_customers.items():
-                for customer_mobile in customers:
-                    if customer_mobile in ticket_customers:
-                        # Count ticket purchases for this customer
-                        customer_tickets = ticket_df[ticket_df['customer_mobile_clean'] == customer_mobile]
-                        dsa_customers[dsa_mobile][customer_mobile]['bought_ticket'] = len(customer_tickets)
+            ticket_counts = ticket_df['customer_mobile_clean'].value_counts()
+            dsa_customers['bought_ticket'] = dsa_customers['customer_mobile'].map(ticket_counts).fillna(0).astype('int32')
         
         # 9. CHECK SCAN TRANSACTIONS
         if scan_customer_col and not scan_df.empty:
             scan_df = scan_df.dropna(subset=['customer_mobile_clean'])
-            scan_customers = set(scan_df['customer_mobile_clean'].unique())
-            
-            for dsa_mobile, customers in dsa_customers.items():
-                for customer_mobile in customers:
-                    if customer_mobile in scan_customers:
-                        # Count scan transactions for this customer
-                        customer_scans = scan_df[scan_df['customer_mobile_clean'] == customer_mobile]
-                        dsa_customers[dsa_mobile][customer_mobile]['did_scan'] = len(customer_scans)
+            scan_counts = scan_df['customer_mobile_clean'].value_counts()
+            dsa_customers['did_scan'] = dsa_customers['customer_mobile'].map(scan_counts).fillna(0).astype('int32')
         
         # 10. UPDATE MATCH STATUS
-        for dsa_mobile, customers in dsa_customers.items():
-            for customer_mobile, customer_data in customers.items():
-                onboarded_by = customer_data['onboarded_by']
-                if onboarded_by == 'NOT ONBOARDED':
-                    customer_data['match_status'] = 'NO ONBOARDING'
-                elif onboarded_by == dsa_mobile:
-                    customer_data['match_status'] = 'MATCH'
-                else:
-                    customer_data['match_status'] = 'MISMATCH'
+        onboarded_by = dsa_customers['onboarded_by'].astype(str)
+        dsa_customers['match_status'] = pd.Categorical(np.select(
+            [onboarded_by == 'NOT ONBOARDED', onboarded_by == dsa_customers['dsa_mobile'].astype(str)],
+            ['NO ONBOARDING', 'MATCH'],
+            default='MISMATCH'
+        ), dtype=MATCH_STATUS_DTYPE)
         
         # 11. CREATE FORMATTED OUTPUT - ONLY NO ONBOARDING CUSTOMERS
-        all_rows = []
-        
-        for dsa_mobile, customers in dsa_customers.items():
-            # Filter for NO ONBOARDING customers who have deposit AND (ticket OR scan)
-            # AND are NOT in Report 1
-            no_onboarding_customers = []
-            for customer_mobile, customer_data in customers.items():
-                if (customer_data['match_status'] == 'NO ONBOARDING' and 
-                    customer_data['deposit_count'] > 0 and
-                    (customer_data['bought_ticket'] > 0 or customer_data['did_scan'] > 0)):
-                    no_onboarding_customers.append((customer_mobile, customer_data))
-            
-            if not no_onboarding_customers:
-                continue
-            
-            # Sort customers by mobile number
-            no_onboarding_customers.sort(key=lambda x: x[0])
-            
-            # Calculate summary for this DSA
-            customer_count = len(no_onboarding_customers)
-            deposit_count = sum(data['deposit_count'] for _, data in no_onboarding_customers)
-            ticket_count = sum(data['bought_ticket'] for _, data in no_onboarding_customers)
-            scan_count = sum(data['did_scan'] for _, data in no_onboarding_customers)
-            payment = customer_count * 25  # GMD 25 per customer
-            
-            # Add summary row for first customer
-            first_customer_mobile, first_customer_data = no_onboarding_customers[0]
-            
-            summary_row = {
-                'dsa_mobile': dsa_mobile,
-                'customer_mobile': first_customer_mobile,
-                'full_name': first_customer_data['full_name'],
-                'bought_ticket': first_customer_data['bought_ticket'],
-                'did_scan': first_customer_data['did_scan'],
-                'deposited': first_customer_data['deposit_count'],
-                'onboarded_by': first_customer_data['onboarded_by'],
-                'match_status': first_customer_data['match_status'],
-                'Customer Count': customer_count,
-                'Deposit Count': deposit_count,
-                'Ticket Count': ticket_count,
-                'Scan To Send Count': scan_count,
-                'Payment': payment
-            }
-            all_rows.append(summary_row)
-            
-            # Add remaining customer rows
-            for customer_mobile, customer_data in no_onboarding_customers[1:]:
-                customer_row = {
-                    'dsa_mobile': dsa_mobile,
-                    'customer_mobile': customer_mobile,
-                    'full_name': customer_data['full_name'],
-                    'bought_ticket': customer_data['bought_ticket'],
-                    'did_scan': customer_data['did_scan'],
-                    'deposited': customer_data['deposit_count'],
-                    'onboarded_by': customer_data['onboarded_by'],
-                    'match_status': customer_data['match_status'],
-                    'Customer Count': '',
-                    'Deposit Count': '',
-                    'Ticket Count': '',
-                    'Scan To Send Count': '',
-                    'Payment': ''
-                }
-                all_rows.append(customer_row)
-            
-            # Add empty separator row after each DSA (optional)
-            all_rows.append({
-                'dsa_mobile': '',
-                'customer_mobile': '',
-                'full_name': '',
-                'bought_ticket': '',
-                'did_scan': '',
-                'deposited': '',
-                'onboarded_by': '',
-                'match_status': '',
-                'Customer Count': '',
-                'Deposit Count': '',
-                'Ticket Count': '',
-                'Scan To Send Count': '',
-                'Payment': ''
-            })
+        columns = [
+            'dsa_mobile', 'customer_mobile', 'full_name', 'bought_ticket', 
+            'did_scan', 'deposited', 'onboarded_by', 'match_status',
+            'Customer Count', 'Deposit Count', 'Ticket Count', 
+            'Scan To Send Count', 'Payment'
+        ]
         
-        # Create DataFrame
-        if all_rows:
-            results_df = pd.DataFrame(all_rows)
-            
-            # Define column order
-            columns = [
-                'dsa_mobile', 'customer_mobile', 'full_name', 'bought_ticket', 
-                'did_scan', 'deposited', 'onboarded_by', 'match_status',
-                'Customer Count', 'Deposit Count', 'Ticket Count', 
-                'Scan To Send Count', 'Payment'
-            ]
-            
-            # Ensure all columns exist
-            for col in columns:
-                if col not in results_df.columns:
-                    results_df[col] = ''
-            
-            results_df = results_df[columns]
+        # NO ONBOARDING customers who have deposit AND (ticket OR scan)
+        no_onboarding_customers = dsa_customers[
+            (dsa_customers['match_status'] == 'NO ONBOARDING') &
+            (dsa_customers['deposit_count'] > 0) &
+            ((dsa_customers['bought_ticket'] > 0) | (dsa_customers['did_scan'] > 0))
+        ].rename(columns={'deposit_count': 'deposited'})
+        
+        if not no_onboarding_customers.empty:
+            # DSAs keep their deposit-data order; customers are sorted by mobile number within each DSA
+            dsa_order = pd.Series(pd.factorize(dsa_customers['dsa_mobile'])[0], index=dsa_customers.index)
+            no_onboarding_customers = no_onboarding_customers.assign(
+                _dsa_order=dsa_order
+            ).sort_values(['_dsa_order', 'customer_mobile'], kind='stable')
+            
+            # Summary for each DSA, shown on the first customer row only
+            dsa_groups = no_onboarding_customers.groupby('_dsa_order', sort=False)
+            summary = pd.DataFrame({
+                'Customer Count': dsa_groups['customer_mobile'].transform('size'),
+                'Deposit Count': dsa_groups['deposited'].transform('sum'),
+                'Ticket Count': dsa_groups['bought_ticket'].transform('sum'),
+                'Scan To Send Count': dsa_groups['did_scan'].transform('sum'),
+            })
+            summary['Payment'] = summary['Customer Count'] * 25  # GMD 25 per customer
+            is_first = ~no_onboarding_customers['_dsa_order'].duplicated()
+            customer_rows = pd.concat(
+                [no_onboarding_customers, summary.where(is_first).astype('Int32')], axis=1
+            )
             
-            st.success(f"Report 2 generated successfully! Found {len(results_df[results_df['Customer Count'] != ''])} DSAs with NO ONBOARDING customers (excluding Report 1 customers).")
+            # Add empty separator row after each DSA
+            separator_rows = pd.DataFrame('', index=range(customer_rows['_dsa_order'].nunique()), columns=columns)
+            separator_rows['_dsa_order'] = customer_rows['_dsa_order'].unique()
+            count_cols = list(summary.columns) + ['bought_ticket', 'did_scan', 'deposited']
+            separator_rows[count_cols] = pd.NA
+            separator_rows = separator_rows.astype({col: 'Int32' for col in count_cols})
+            results_df = (
+                pd.concat([customer_rows, separator_rows], ignore_index=True)
+                .sort_values('_dsa_order', kind='stable')
+                [columns]
+                .reset_index(drop=True)
+            )
+            # Counts are nullable integers: blank on separator rows, summaries filled on each DSA's first row only
+            results_df = results_df.astype({col: 'Int32' for col in count_cols})
+            # Separator rows are blank, so '' is one of the match status categories
+            results_df['match_status'] = results_df['match_status'].astype(MATCH_STATUS_DTYPE)
+            # DSA filters then compare category codes, as in Report 1
+            results_df['dsa_mobile'] = results_df['dsa_mobile'].astype('category')
+            # The text columns fall back to object when joined with the blank rows
+            text_cols = ['customer_mobile', 'full_name', 'onboarded_by']
+            results_df[text_cols] = results_df[text_cols].astype('string[pyarrow]')
+            
+            st.success(f"Report 2 generated successfully! Found {int(results_df['Customer Count'].notna().sum())} DSAs with NO ONBOARDING customers (excluding Report 1 customers).")
             
             # DEBUG: Show some statistics
             total_no_onboarding = results_df[results_df['match_status'] == 'NO ONBOARDING'].shape[0]
-            total_customers = results_df[results_df['Customer Count'] != '']['Customer Count'].astype(float).sum()
+            total_customers = results_df['Customer Count'].sum()
             st.info(f"Total NO ONBOARDING customers: {total_no_onboarding}")
             st.info(f"Total customers in summary: {int(total_customers)}")
             
         else:
-            results_df = pd.DataFrame(columns=[
-                'dsa_mobile', 'customer_mobile', 'full_name', 'bought_ticket', 
-                'did_scan', 'deposited', 'onboarded_by', 'match_status',
-                'Customer Count', 'Deposit Count', 'Ticket Count', 
-                'Scan To Send Count', 'Payment'
-            ])
+            results_df = pd.DataFrame(columns=columns)
             st.info("No NO ONBOARDING customers found meeting the criteria (or all are already in Report 1).")
         
         # Return all cleaned dataframes for debugging
@@ -1097,25 +982,12 @@ def check_duplicate_customers_between_reports(report_1_data, report_2_data):
     if "qualified_customers" not in report_1_data or "report_2_results" not in report_2_data:
         return
     
-    report1_customers = set(report_1_data["qualified_customers"]['customer_mobile'].astype(str).str.strip().unique())
-    report2_customers = set(report_2_data["report_2_results"]['customer_mobile'].astype(str).str.strip().unique())
+    report1_customers = pd.Series(report_1_data["qualified_customers"]['customer_mobile'].unique())
+    report2_customers = pd.Series(report_2_data["report_2_results"]['customer_mobile'].unique())
     
-    # Clean mobile numbers for comparison
-    def clean_duplicate_mobile(mobile):
-        if pd.isna(mobile):
-            return None
-        mobile_str = str(mobile)
-        mobile_clean = ''.join(filter(str.isdigit, mobile_str))
-        if len(mobile_clean) >= 7:
-            return mobile_clean[-7:]
-        return mobile_clean
-    
-    report1_customers_clean = {clean_duplicate_mobile(mobile) for mobile in report1_customers}
-    report2_customers_clean = {clean_duplicate_mobile(mobile) for mobile in report2_customers}
-    
-    # Remove None values
-    report1_customers_clean = {mobile for mobile in report1_customers_clean if mobile}
-    report2_customers_clean = {mobile for mobile in report2_customers_clean if mobile}
+    # Clean mobile numbers for comparison; missing and blank mobiles drop out
+    report1_customers_clean = set(clean_mobile_series(report1_customers).dropna())
+    report2_customers_clean = set(clean_mobile_series(report2_customers).dropna())
     
     duplicates = report1_customers_clean.intersection(report2_customers_clean)
     
@@ -1138,8 +1010,8 @@ def generate_payment_report(report_1_data, report_2_data):
             
             # Get rows with payment data (first rows per DSA where Customer Count is filled)
             payment_rows = report_1_data["qualified_customers"][
-                report_1_data["qualified_customers"]['Customer Count'] != ''
-            ].copy()
+                report_1_data["qualified_customers"]['Customer Count'].notna()
+            ]
             
             if not payment_rows.empty:
                 for _, row in payment_rows.iterrows():
@@ -1164,9 +1036,9 @@ def generate_payment_report(report_1_data, report_2_data):
             
             # Get rows with payment data (rows where Customer Count is filled)
             payment_rows = report_2_data["report_2_results"][
-                (report_2_data["report_2_results"]['Customer Count'] != '') &
-                (report_2_data["report_2_results"]['Payment'] != '')
-            ].copy()
+                report_2_data["report_2_results"]['Customer Count'].notna() &
+                report_2_data["report_2_results"]['Payment'].notna()
+            ]
             
             if not payment_rows.empty:
                 for _, row in payment_rows.iterrows():
@@ -1227,6 +1099,29 @@ def generate_payment_report(report_1_data, report_2_data):
         return pd.DataFrame(columns=['DSA_Mobile', 'Payment for Qualified Customers', 
                                      'Payment for not onboarded Customers', 'Total Amount Payable'])
 
+def filter_report_rows(df, filters, payment_col):
+    """Keep the rows of DSAs that pass the DSA, minimum customers and minimum payment filters"""
+    keep = pd.Series(True, index=df.index)
+    
+    # Apply DSA filter
+    if filters["dsa_option"] == "Single DSA" and filters["selected_dsa"]:
+        keep &= df["dsa_mobile"] == filters["selected_dsa"]
+    elif filters["dsa_option"] == "Multiple DSAs" and filters["selected_dsas"]:
+        keep &= df["dsa_mobile"].isin(filters["selected_dsas"])
+    
+    # Apply minimum customers and payment filters on each DSA's summary row, then keep all of its rows
+    if filters["min_customers"] > 0 or filters["min_payment"] > 0:
+        summary_rows = keep & df['Customer Count'].notna()
+        if summary_rows.any():
+            passes = summary_rows.copy()
+            if filters["min_customers"] > 0:
+                passes &= (df['Customer Count'] >= filters["min_customers"]).fillna(False)
+            if filters["min_payment"] > 0:
+                passes &= (df[payment_col] >= filters["min_payment"]).fillna(False)
+            keep &= df['dsa_mobile'].isin(df.loc[passes, 'dsa_mobile'])
+    
+    return df[keep]
+
 def apply_filters_to_data(data, filters, report_type):
     """Apply DSA and other filters to the data"""
     if report_type == "report_1":
@@ -1234,33 +1129,9 @@ def apply_filters_to_data(data, filters, report_type):
             return data
         
         filtered_data = data.copy()
-        qualified_df = data["qualified_customers"].copy()
-        
-        # Apply DSA filter
-        if filters["dsa_option"] == "Single DSA" and filters["selected_dsa"]:
-            qualified_df = qualified_df[qualified_df["dsa_mobile"] == filters["selected_dsa"]]
-        elif filters["dsa_option"] == "Multiple DSAs" and filters["selected_dsas"]:
-            qualified_df = qualified_df[qualified_df["dsa_mobile"].isin(filters["selected_dsas"])]
-        
-        # Apply minimum customers filter
-        if filters["min_customers"] > 0:
-            # Get DSAs with at least min_customers
-            dsa_counts = qualified_df[qualified_df['Customer Count'] != '']
-            if not dsa_counts.empty:
-                dsa_counts['Customer Count'] = pd.to_numeric(dsa_counts['Customer Count'], errors='coerce').fillna(0)
-                valid_dsas = dsa_counts[dsa_counts['Customer Count'] >= filters["min_customers"]]['dsa_mobile']
-                qualified_df = qualified_df[qualified_df['dsa_mobile'].isin(valid_dsas)]
-        
-        # Apply minimum payment filter
-        if filters["min_payment"] > 0:
-            # Get DSAs with at least min_payment
-            dsa_payments = qualified_df[qualified_df['Payment (Customer Count *40)'] != '']
-            if not dsa_payments.empty:
-                dsa_payments['Payment (Customer Count *40)'] = pd.to_numeric(dsa_payments['Payment (Customer Count *40)'], errors='coerce').fillna(0)
-                valid_dsas = dsa_payments[dsa_payments['Payment (Customer Count *40)'] >= filters["min_payment"]]['dsa_mobile']
-                qualified_df = qualified_df[qualified_df['dsa_mobile'].isin(valid_dsas)]
-        
-        filtered_data["qualified_customers"] = qualified_df
+        filtered_data["qualified_customers"] = filter_report_rows(
+            data["qualified_customers"], filters, 'Payment (Customer Count *40)'
+        )
         return filtered_data
     
     elif report_type == "report_2":
@@ -1268,143 +1139,144 @@ def apply_filters_to_data(data, filters, report_type):
             return data
         
         filtered_data = data.copy()
-        report2_df = data["report_2_results"].copy()
-        
-        # Apply DSA filter
-        if filters["dsa_option"] == "Single DSA" and filters["selected_dsa"]:
-            report2_df = report2_df[report2_df["dsa_mobile"] == filters["selected_dsa"]]
-        elif filters["dsa_option"] == "Multiple DSAs" and filters["selected_dsas"]:
-            report2_df = report2_df[report2_df["dsa_mobile"].isin(filters["selected_dsas"])]
-        
-        # Apply minimum customers filter
-        if filters["min_customers"] > 0:
-            # Get DSAs with at least min_customers
-            dsa_counts = report2_df[report2_df['Customer Count'] != '']
-            if not dsa_counts.empty:
-                dsa_counts['Customer Count'] = pd.to_numeric(dsa_counts['Customer Count'], errors='coerce').fillna(0)
-                valid_dsas = dsa_counts[dsa_counts['Customer Count'] >= filters["min_customers"]]['dsa_mobile']
-                report2_df = report2_df[report2_df['dsa_mobile'].isin(valid_dsas)]
-        
-        # Apply minimum payment filter
-        if filters["min_payment"] > 0:
-            # Get DSAs with at least min_payment
-            dsa_payments = report2_df[report2_df['Payment'] != '']
-            if not dsa_payments.empty:
-                dsa_payments['Payment'] = pd.to_numeric(dsa_payments['Payment'], errors='coerce').fillna(0)
-                valid_dsas = dsa_payments[dsa_payments['Payment'] >= filters["min_payment"]]['dsa_mobile']
-                report2_df = report2_df[report2_df['dsa_mobile'].isin(valid_dsas)]
-        
-        filtered_data["report_2_results"] = report2_df
+        filtered_data["report_2_results"] = filter_report_rows(data["report_2_results"], filters, 'Payment')
         return filtered_data
     
     return data
 
+@st.cache_data(show_spinner=False, max_entries=8, hash_funcs={pd.DataFrame: hash_dataframe})
+def dataframe_to_csv_bytes(df, sep=','):
+    """Encode a report as CSV for download, once per report content rather than on every rerun"""
+    return df.to_csv(index=False, sep=sep).encode('utf-8')
+
+@st.cache_data(show_spinner=False, max_entries=8, hash_funcs={pd.DataFrame: hash_dataframe})
+def dataframe_to_arrow(df):
+    """Convert a report to an Arrow table for st.dataframe, once per report content"""
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # The report counts are typed, so this only catches an object column mixing strings and numbers; show it as text
+        mixed_cols = {col: 'string' for col in df.columns if df[col].dtype == 'object'}
+        return pa.Table.from_pandas(df.astype(mixed_cols), preserve_index=False)
+
+# Don't scan every cell for URLs when writing reports (mobile numbers and names never need hyperlinks)
+XLSX_ENGINE_KWARGS = {'options': {'strings_to_urls': False}}
+
+@st.cache_data(show_spinner=False, max_entries=8, hash_funcs={pd.DataFrame: hash_dataframe})
+def dataframes_to_excel_bytes(sheets):
+    """Write (sheet_name, dataframe) pairs to an xlsx workbook, once per report content rather than on every rerun"""
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter', engine_kwargs=XLSX_ENGINE_KWARGS) as writer:
+        for sheet_name, df in sheets:
+            df.to_excel(writer, index=False, sheet_name=sheet_name)
+    return output.getvalue()
+
 def create_master_excel_report(filtered_report_1, filtered_report_2, filtered_payment_report):
     """Create master Excel report with all reports in separate sheets"""
     try:
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            # Report 1 sheets
-            if filtered_report_1 and "qualified_customers" in filtered_report_1 and not filtered_report_1["qualified_customers"].empty:
-                filtered_report_1["qualified_customers"].to_excel(writer, index=False, sheet_name="Report1_Qualified_Customers")
-            
-            if filtered_report_1 and "dsa_summary" in filtered_report_1 and not filtered_report_1["dsa_summary"].empty:
-                filtered_report_1["dsa_summary"].to_excel(writer, index=False, sheet_name="Report1_DSA_Summary")
-            
-            if filtered_report_1 and "onboarded_customers" in filtered_report_1 and not filtered_report_1["onboarded_customers"].empty:
-                filtered_report_1["onboarded_customers"].to_excel(writer, index=False, sheet_name="Report1_All_Customers")
-            
-            if filtered_report_1 and "ticket_details" in filtered_report_1 and not filtered_report_1["ticket_details"].empty:
-                filtered_report_1["ticket_details"].to_excel(writer, index=False, sheet_name="Report1_Ticket_Details")
-            
-            if filtered_report_1 and "scan_details" in filtered_report_1 and not filtered_report_1["scan_details"].empty:
-                filtered_report_1["scan_details"].to_excel(writer, index=False, sheet_name="Report1_Scan_Details")
-            
-            if filtered_report_1 and "deposit_details" in filtered_report_1 and not filtered_report_1["deposit_details"].empty:
-                filtered_report_1["deposit_details"].to_excel(writer, index=False, sheet_name="Report1_Deposit_Details")
-            
-            # Report 2 sheets
-            if filtered_report_2 and "report_2_results" in filtered_report_2 and not filtered_report_2["report_2_results"].empty:
-                filtered_report_2["report_2_results"].to_excel(writer, index=False, sheet_name="Report2_NO_ONBOARDING")
+        # Collect the sheets first, then write the workbook in one cached call
+        sheets = []
+        
+        # Report 1 sheets
+        if filtered_report_1 and "qualified_customers" in filtered_report_1 and not filtered_report_1["qualified_customers"].empty:
+            sheets.append(("Report1_Qualified_Customers", filtered_report_1["qualified_customers"]))
+        
+        if filtered_report_1 and "dsa_summary" in filtered_report_1 and not filtered_report_1["dsa_summary"].empty:
+            sheets.append(("Report1_DSA_Summary", filtered_report_1["dsa_summary"]))
+        
+        if filtered_report_1 and "onboarded_customers" in filtered_report_1 and not filtered_report_1["onboarded_customers"].empty:
+            sheets.append(("Report1_All_Customers", filtered_report_1["onboarded_customers"]))
+        
+        if filtered_report_1 and "ticket_details" in filtered_report_1 and not filtered_report_1["ticket_details"].empty:
+            sheets.append(("Report1_Ticket_Details", filtered_report_1["ticket_details"]))
+        
+        if filtered_report_1 and "scan_details" in filtered_report_1 and not filtered_report_1["scan_details"].empty:
+            sheets.append(("Report1_Scan_Details", filtered_report_1["scan_details"]))
+        
+        if filtered_report_1 and "deposit_details" in filtered_report_1 and not filtered_report_1["deposit_details"].empty:
+            sheets.append(("Report1_Deposit_Details", filtered_report_1["deposit_details"]))
+        
+        # Report 2 sheets
+        if filtered_report_2 and "report_2_results" in filtered_report_2 and not filtered_report_2["report_2_results"].empty:
+            sheets.append(("Report2_NO_ONBOARDING", filtered_report_2["report_2_results"]))
+        
+        # Payment Report sheet
+        if filtered_payment_report is not None and not filtered_payment_report.empty:
+            sheets.append(("Payment_Report", filtered_payment_report))
+        
+        # Add a summary sheet
+        summary_data = []
+        
+        # Report 1 Summary
+        if filtered_report_1 and "dsa_summary" in filtered_report_1 and not filtered_report_1["dsa_summary"].empty:
+            total_customers_r1 = 0
+            total_payment_r1 = 0
             
-            # Payment Report sheet
-            if filtered_payment_report is not None and not filtered_payment_report.empty:
-                filtered_payment_report.to_excel(writer, index=False, sheet_name="Payment_Report")
+            if "Customer_Count" in filtered_report_1["dsa_summary"].columns:
+                total_customers_r1 = int(filtered_report_1["dsa_summary"]["Customer_Count"].sum())
             
-            # Add a summary sheet
-            summary_data = []
+            if "qualified_customers" in filtered_report_1 and not filtered_report_1["qualified_customers"].empty:
+                payment_col = 'Payment (Customer Count *40)'
+                if payment_col in filtered_report_1["qualified_customers"].columns:
+                    # Get only rows with payment values (first rows per DSA)
+                    payment_rows = filtered_report_1["qualified_customers"][filtered_report_1["qualified_customers"][payment_col].notna()]
+                    if not payment_rows.empty:
+                        total_payment_r1 = float(payment_rows[payment_col].sum())
             
-            # Report 1 Summary
-            if filtered_report_1 and "dsa_summary" in filtered_report_1 and not filtered_report_1["dsa_summary"].empty:
-                total_customers_r1 = 0
-                total_payment_r1 = 0
-                
-                if "Customer_Count" in filtered_report_1["dsa_summary"].columns:
-                    total_customers_r1 = int(filtered_report_1["dsa_summary"]["Customer_Count"].sum())
-                
-                if "qualified_customers" in filtered_report_1 and not filtered_report_1["qualified_customers"].empty:
-                    payment_col = 'Payment (Customer Count *40)'
-                    if payment_col in filtered_report_1["qualified_customers"].columns:
-                        # Get only rows with payment values (first rows per DSA)
-                        payment_rows = filtered_report_1["qualified_customers"][filtered_report_1["qualified_customers"][payment_col] != '']
-                        if not payment_rows.empty:
-                            total_payment_r1 = float(payment_rows[payment_col].sum())
-                
-                summary_data.append({
-                    'Report': 'Report 1: DSA Performance',
-                    'Total DSAs': int(filtered_report_1["dsa_summary"]["dsa_mobile"].nunique()),
-                    'Total Customers': total_customers_r1,
-                    'Total Payment (GMD)': total_payment_r1
-                })
+            summary_data.append({
+                'Report': 'Report 1: DSA Performance',
+                'Total DSAs': int(filtered_report_1["dsa_summary"]["dsa_mobile"].nunique()),
+                'Total Customers': total_customers_r1,
+                'Total Payment (GMD)': total_payment_r1
+            })
+        
+        # Report 2 Summary
+        if filtered_report_2 and "report_2_results" in filtered_report_2 and not filtered_report_2["report_2_results"].empty:
+            report2_summary_rows = filtered_report_2["report_2_results"][filtered_report_2["report_2_results"]['Customer Count'].notna()]
             
-            # Report 2 Summary
-            if filtered_report_2 and "report_2_results" in filtered_report_2 and not filtered_report_2["report_2_results"].empty:
-                report2_summary_rows = filtered_report_2["report_2_results"][filtered_report_2["report_2_results"]['Customer Count'] != '']
-                
-                total_dsas_r2 = 0
-                total_customers_r2 = 0
-                total_payment_r2 = 0
-                
-                if not report2_summary_rows.empty:
-                    total_dsas_r2 = int(report2_summary_rows['dsa_mobile'].nunique())
-                    total_customers_r2 = int(pd.to_numeric(report2_summary_rows['Customer Count'], errors='coerce').sum())
-                    total_payment_r2 = float(pd.to_numeric(report2_summary_rows['Payment'], errors='coerce').sum())
-                
-                summary_data.append({
-                    'Report': 'Report 2: NO ONBOARDING',
-                    'Total DSAs': total_dsas_r2,
-                    'Total Customers': total_customers_r2,
-                    'Total Payment (GMD)': total_payment_r2
-                })
+            total_dsas_r2 = 0
+            total_customers_r2 = 0
+            total_payment_r2 = 0
             
-            # Payment Report Summary
-            if filtered_payment_report is not None and not filtered_payment_report.empty:
-                total_dsas_pr = len(filtered_payment_report) - 1  # Exclude Total row
-                total_qualified_payment = 0
-                total_not_onboarded_payment = 0
-                total_payable = 0
-                
-                if filtered_payment_report['DSA_Mobile'].iloc[-1] == 'Total':
-                    totals_row = filtered_payment_report.iloc[-1]
-                    total_qualified_payment = float(totals_row['Payment for Qualified Customers'])
-                    total_not_onboarded_payment = float(totals_row['Payment for not onboarded Customers'])
-                    total_payable = float(totals_row['Total Amount Payable'])
-                
-                summary_data.append({
-                    'Report': 'Payment Report',
-                    'Total DSAs': total_dsas_pr,
-                    'Total Qualified Payment': total_qualified_payment,
-                    'Total Not Onboarded Payment': total_not_onboarded_payment,
-                    'Total Amount Payable': total_payable
-                })
+            if not report2_summary_rows.empty:
+                total_dsas_r2 = int(report2_summary_rows['dsa_mobile'].nunique())
+                total_customers_r2 = int(report2_summary_rows['Customer Count'].sum())
+                total_payment_r2 = float(report2_summary_rows['Payment'].sum())
             
-            # Create summary DataFrame
-            if summary_data:
-                summary_df = pd.DataFrame(summary_data)
-                summary_df.to_excel(writer, index=False, sheet_name="Summary")
+            summary_data.append({
+                'Report': 'Report 2: NO ONBOARDING',
+                'Total DSAs': total_dsas_r2,
+                'Total Customers': total_customers_r2,
+                'Total Payment (GMD)': total_payment_r2
+            })
+        
+        # Payment Report Summary
+        if filtered_payment_report is not None and not filtered_payment_report.empty:
+            total_dsas_pr = len(filtered_payment_report) - 1  # Exclude Total row
+            total_qualified_payment = 0
+            total_not_onboarded_payment = 0
+            total_payable = 0
+            
+            if filtered_payment_report['DSA_Mobile'].iloc[-1] == 'Total':
+                totals_row = filtered_payment_report.iloc[-1]
+                total_qualified_payment = float(totals_row['Payment for Qualified Customers'])
+                total_not_onboarded_payment = float(totals_row['Payment for not onboarded Customers'])
+                total_payable = float(totals_row['Total Amount Payable'])
+            
+            summary_data.append({
+                'Report': 'Payment Report',
+                'Total DSAs': total_dsas_pr,
+                'Total Qualified Payment': total_qualified_payment,
+                'Total Not Onboarded Payment': total_not_onboarded_payment,
+                'Total Amount Payable': total_payable
+            })
         
-        output.seek(0)
-        return output
+        # Create summary DataFrame
+        if summary_data:
+            summary_df = pd.DataFrame(summary_data)
+            sheets.append(("Summary", summary_df))
+        
+        return dataframes_to_excel_bytes(tuple(sheets))
     except Exception as e:
         st.error(f"Error creating master Excel report: {str(e)}")
         import traceback
@@ -1439,7 +1311,7 @@ def display_metrics(data, report_type):
             with col4:
                 if "qualified_customers" in data and not data["qualified_customers"].empty:
                     # Calculate total payment from Customer Count column (only in first rows)
-                    payment_rows = data["qualified_customers"][data["qualified_customers"]['Customer Count'] != '']
+                    payment_rows = data["qualified_customers"][data["qualified_customers"]['Customer Count'].notna()]
                     if not payment_rows.empty:
                         total_payment = payment_rows['Payment (Customer Count *40)'].sum()
                     else:
@@ -1457,33 +1329,24 @@ def display_metrics(data, report_type):
         # REPORT 2 METRICS
         if "report_2_results" in data and not data["report_2_results"].empty:
             # Get summary rows (rows with Customer Count filled)
-            summary_rows = data["report_2_results"][
-                (data["report_2_results"]['Customer Count'] != '') & 
-                (data["report_2_results"]['Customer Count'] != 0)
-            ].copy()
+            summary_rows = data["report_2_results"][data["report_2_results"]['Customer Count'].notna()]
             
-            # Clean numeric columns
+            # Summary columns are already numeric (Int32), so they are totalled in one reduction
             if not summary_rows.empty:
-                summary_rows['Customer Count'] = pd.to_numeric(summary_rows['Customer Count'], errors='coerce').fillna(0)
-                summary_rows['Ticket Count'] = pd.to_numeric(summary_rows['Ticket Count'], errors='coerce').fillna(0)
-                summary_rows['Scan To Send Count'] = pd.to_numeric(summary_rows['Scan To Send Count'], errors='coerce').fillna(0)
-                summary_rows['Payment'] = pd.to_numeric(summary_rows['Payment'], errors='coerce').fillna(0)
+                totals = summary_rows[['Customer Count', 'Ticket Count', 'Payment']].sum()
                 
                 with col1:
                     total_dsas = summary_rows['dsa_mobile'].nunique()
                     st.metric("Total DSAs", f"{int(total_dsas):,}")
                 
                 with col2:
-                    total_customers = int(summary_rows['Customer Count'].sum())
-                    st.metric("NO ONBOARDING Customers", f"{total_customers:,}")
+                    st.metric("NO ONBOARDING Customers", f"{int(totals['Customer Count']):,}")
                 
                 with col3:
-                    total_tickets = int(summary_rows['Ticket Count'].sum())
-                    st.metric("Total Tickets", f"{total_tickets:,}")
+                    st.metric("Total Tickets", f"{int(totals['Ticket Count']):,}")
                 
                 with col4:
-                    total_payment = float(summary_rows['Payment'].sum())
-                    st.metric("Total Payment (GMD)", f"GMD {total_payment:,.2f}")
+                    st.metric("Total Payment (GMD)", f"GMD {float(totals['Payment']):,.2f}")
             else:
                 col1.metric("Total DSAs", "0")
                 col2.metric("NO ONBOARDING Customers", "0")
@@ -1536,16 +1399,17 @@ def display_filters():
         ["All Time", "Last 7 Days", "Last 30 Days", "Last 90 Days", "Custom Range"]
     )
     
-    # Set default dates based on selection
+    # Set default dates based on selection (whole days, so the cached reports are reused within a day)
+    today = datetime.now().date()
     if date_option == "Last 7 Days":
-        start_date = datetime.now() - timedelta(days=7)
-        end_date = datetime.now()
+        start_date = today - timedelta(days=7)
+        end_date = today
     elif date_option == "Last 30 Days":
-        start_date = datetime.now() - timedelta(days=30)
-        end_date = datetime.now()
+        start_date = today - timedelta(days=30)
+        end_date = today
     elif date_option == "Last 90 Days":
-        start_date = datetime.now() - timedelta(days=90)
-        end_date = datetime.now()
+        start_date = today - timedelta(days=90)
+        end_date = today
     elif date_option == "Custom Range":
         col1, col2 = st.sidebar.columns(2)
         with col1:
@@ -1565,8 +1429,7 @@ def display_filters():
     
     dsa_list = []
     if 'report_1_data' in st.session_state and st.session_state.report_1_data:
-        if "dsa_summary" in st.session_state.report_1_data and not st.session_state.report_1_data["dsa_summary"].empty:
-            dsa_list = st.session_state.report_1_data["dsa_summary"]["dsa_mobile"].unique().tolist()
+        dsa_list = st.session_state.report_1_data.get("dsa_list", [])
     
     if dsa_option == "Single DSA":
         selected_dsa = st.sidebar.selectbox("Select DSA", dsa_list if dsa_list else ["No data available"])
@@ -1594,11 +1457,18 @@ def display_filters():
         "apply_filters": apply_filters
     }
 
-def clean_numeric_column(series):
-    """Clean a numeric column that may contain mixed types"""
-    if series.dtype == 'object':
-        return pd.to_numeric(series.replace('', '0'), errors='coerce').fillna(0)
-    return series
+def create_top_bar_chart(x, y, title, y_title, colorscale, uirevision):
+    """Bar chart of already-aggregated top-N values, colored by value"""
+    y = y.to_numpy()
+    fig = go.Figure(go.Bar(
+        x=x.astype(str).to_numpy(),
+        y=y,
+        marker=dict(color=y, colorscale=colorscale, showscale=True, colorbar=dict(title=y_title))
+    ))
+    # Mobiles are labels, not numbers; uirevision keeps the client-side chart state across reruns
+    fig.update_layout(title=title, xaxis_title="DSA Mobile", yaxis_title=y_title,
+                      xaxis_type="category", uirevision=uirevision)
+    return fig
 
 def create_visualizations(data, report_type):
     """Create visualizations for the dashboard"""
@@ -1607,16 +1477,11 @@ def create_visualizations(data, report_type):
             return None, None
         
         # Visualization 1: Top DSAs by Customer Count
-        top_dsas = data["dsa_summary"].nlargest(10, "Customer_Count")
-        
-        fig1 = px.bar(
-            top_dsas,
-            x="dsa_mobile",
-            y="Customer_Count",
-            title="Top 10 DSAs by Customer Count",
-            labels={"dsa_mobile": "DSA Mobile", "Customer_Count": "Number of Customers"},
-            color="Customer_Count",
-            color_continuous_scale="Viridis"
+        top_dsas = data["dsa_summary"].nlargest(10, "Customer_Count")[["dsa_mobile", "Customer_Count"]]
+        
+        fig1 = create_top_bar_chart(
+            top_dsas["dsa_mobile"], top_dsas["Customer_Count"],
+            "Top 10 DSAs by Customer Count", "Number of Customers", "Viridis", "report_1_customers"
         )
         
         # Visualization 2: Conversion Rates
@@ -1629,13 +1494,16 @@ def create_visualizations(data, report_type):
             conversion_cols.append("Scan_Conversion_Rate")
         
         if conversion_cols:
-            fig2 = px.bar(
-                data["dsa_summary"].nlargest(10, conversion_cols[0]),
-                x="dsa_mobile",
-                y=conversion_cols,
+            top_conversion = data["dsa_summary"].nlargest(10, conversion_cols[0])[["dsa_mobile"] + conversion_cols]
+            x = top_conversion["dsa_mobile"].astype(str).to_numpy()
+            fig2 = go.Figure([go.Bar(x=x, y=top_conversion[col].to_numpy(), name=col) for col in conversion_cols])
+            fig2.update_layout(
                 title="Top 10 DSAs by Conversion Rates",
-                labels={"dsa_mobile": "DSA Mobile", "value": "Conversion Rate (%)"},
-                barmode="group"
+                xaxis_title="DSA Mobile",
+                yaxis_title="Conversion Rate (%)",
+                xaxis_type="category",
+                barmode="group",
+                uirevision="report_1_conversion"
             )
         else:
             fig2 = None
@@ -1646,29 +1514,17 @@ def create_visualizations(data, report_type):
         if "report_2_results" not in data or data["report_2_results"].empty:
             return None, None
         
-        # Clean numeric columns
-        if 'Payment' in data["report_2_results"].columns:
-            data["report_2_results"]['Payment_clean'] = clean_numeric_column(data["report_2_results"]['Payment'])
-        
-        summary_rows = data["report_2_results"][
-            (data["report_2_results"]['Customer Count'] != '') & 
-            (data["report_2_results"]['Customer Count'] != 0)
-        ]
+        summary_rows = data["report_2_results"][data["report_2_results"]['Customer Count'].notna()]
         
         if summary_rows.empty:
             return None, None
         
         # Visualization 1: Top DSAs by Payment
-        top_payment = summary_rows.nlargest(10, "Payment_clean" if "Payment_clean" in summary_rows.columns else "Payment")
-        
-        fig1 = px.bar(
-            top_payment,
-            x="dsa_mobile",
-            y="Payment_clean" if "Payment_clean" in top_payment.columns else "Payment",
-            title="Top 10 DSAs by Payment (GMD)",
-            labels={"dsa_mobile": "DSA Mobile", "Payment_clean": "Payment Amount (GMD)", "Payment": "Payment Amount (GMD)"},
-            color="Payment_clean" if "Payment_clean" in top_payment.columns else "Payment",
-            color_continuous_scale="Plasma"
+        top_payment = summary_rows.nlargest(10, "Payment")[["dsa_mobile", "Payment"]]
+        
+        fig1 = create_top_bar_chart(
+            top_payment["dsa_mobile"], top_payment["Payment"],
+            "Top 10 DSAs by Payment (GMD)", "Payment Amount (GMD)", "Plasma", "report_2_payment"
         )
         
         # Visualization 2: Only show NO ONBOARDING distribution
@@ -1677,17 +1533,15 @@ def create_visualizations(data, report_type):
             no_onboarding_data = data["report_2_results"][data["report_2_results"]['match_status'] == 'NO ONBOARDING']
             if not no_onboarding_data.empty:
                 # Count by DSA
-                dsa_counts = no_onboarding_data['dsa_mobile'].value_counts().reset_index()
-                dsa_counts.columns = ["DSA Mobile", "NO ONBOARDING Customers"]
+                # Observed DSAs only, with ties kept in report order
+                dsa_counts = (no_onboarding_data.groupby('dsa_mobile', observed=True, sort=False).size()
+                              .sort_values(ascending=False, kind='stable')
+                              .rename_axis("DSA Mobile").reset_index(name="NO ONBOARDING Customers"))
                 
-                fig2 = px.bar(
-                    dsa_counts.head(10),
-                    x="DSA Mobile",
-                    y="NO ONBOARDING Customers",
-                    title="Top 10 DSAs by NO ONBOARDING Customers",
-                    labels={"DSA Mobile": "DSA Mobile", "NO ONBOARDING Customers": "Number of Customers"},
-                    color="NO ONBOARDING Customers",
-                    color_continuous_scale="Reds"
+                top_counts = dsa_counts.head(10)
+                fig2 = create_top_bar_chart(
+                    top_counts["DSA Mobile"], top_counts["NO ONBOARDING Customers"],
+                    "Top 10 DSAs by NO ONBOARDING Customers", "Number of Customers", "Reds", "report_2_no_onboarding"
                 )
             else:
                 fig2 = None
@@ -1712,16 +1566,25 @@ def main():
     scan_file = st.sidebar.file_uploader("Scan Data (CSV)", type=['csv'])
     
     # Process files when uploaded
+    upload_fingerprint = None
     if onboarding_file and ticket_file and deposit_file and scan_file:
+        upload_fingerprint = uploaded_files_fingerprint(
+            [onboarding_file, ticket_file, conversion_file, deposit_file, scan_file]
+        )
+    
+    if upload_fingerprint and upload_fingerprint == st.session_state.files_fingerprint:
+        # Same files as the last run: keep the processed reports instead of re-reading and re-hashing them
+        st.sidebar.success("✓ All files processed successfully!")
+    elif upload_fingerprint:
         try:
             # Read uploaded files
-            onboarding_df = pd.read_csv(onboarding_file)
-            ticket_df = pd.read_csv(ticket_file)
-            deposit_df = pd.read_csv(deposit_file, low_memory=False)
-            scan_df = pd.read_csv(scan_file, low_memory=False)
+            onboarding_df = load_csv(onboarding_file.getvalue())
+            ticket_df = normalize_ticket_schema(load_csv(ticket_file.getvalue()))
+            deposit_df = load_csv(deposit_file.getvalue())
+            scan_df = load_csv(scan_file.getvalue())
             conversion_df = pd.DataFrame()
             if conversion_file:
-                conversion_df = pd.read_csv(conversion_file)
+                conversion_df = load_csv(conversion_file.getvalue())
             
             # Store in session state
             st.session_state.uploaded_files = {
@@ -1774,6 +1637,9 @@ def main():
                     st.session_state.payment_report_data = payment_report
                     st.success("✓ Payment Report generated successfully!")
             
+            # Only skip later reruns once both reports succeeded, so processing warnings keep showing
+            if report_1_data and report_2_data:
+                st.session_state.files_fingerprint = upload_fingerprint
             st.sidebar.success("✓ All files processed successfully!")
             
         except Exception as e:
@@ -1878,14 +1744,14 @@ def main():
                 # Display data
                 if "dsa_summary" in filtered_report_1 and not filtered_report_1["dsa_summary"].empty:
                     st.markdown("#### DSA Summary Table")
-                    st.dataframe(filtered_report_1["dsa_summary"], use_container_width=True)
+                    st.dataframe(dataframe_to_arrow(filtered_report_1["dsa_summary"]), use_container_width=True)
                     
                     # Show qualified customers
                     with st.expander("View Qualified Customers Details"):
                         qualified_df = filtered_report_1.get("qualified_customers", pd.DataFrame())
                         if not qualified_df.empty:
                             st.markdown("**Qualified Customers (Customers who deposited AND bought ticket/did scan):**")
-                            st.dataframe(qualified_df, use_container_width=True)
+                            st.dataframe(dataframe_to_arrow(qualified_df), use_container_width=True)
                             st.caption("Note: Payment is GMD 40 per qualified customer. Summary columns shown only for first customer per DSA.")
                         else:
                             st.info("No qualified customers found.")
@@ -1912,7 +1778,7 @@ def main():
                 
                 # Display data
                 st.markdown("#### NO ONBOARDING Customers Analysis")
-                st.dataframe(filtered_report_2["report_2_results"], use_container_width=True)
+                st.dataframe(dataframe_to_arrow(filtered_report_2["report_2_results"]), use_container_width=True)
                 
                 # Show statistics
                 with st.expander("View Detailed Statistics"):
@@ -1921,26 +1787,25 @@ def main():
                         
                         with col1:
                             st.markdown("**Transaction Patterns (NO ONBOARDING only)**")
-                            summary_rows = filtered_report_2["report_2_results"][filtered_report_2["report_2_results"]['Customer Count'] != '']
+                            summary_rows = filtered_report_2["report_2_results"][filtered_report_2["report_2_results"]['Customer Count'].notna()]
                             if not summary_rows.empty:
-                                # Clean numeric columns
-                                summary_rows['Customer Count'] = clean_numeric_column(summary_rows['Customer Count'])
-                                summary_rows['Ticket Count'] = clean_numeric_column(summary_rows['Ticket Count'])
-                                summary_rows['Scan To Send Count'] = clean_numeric_column(summary_rows['Scan To Send Count'])
+                                # Compute every statistic in one aggregation
+                                stat_cols = ['Customer Count', 'Ticket Count', 'Scan To Send Count', 'Payment']
+                                stats = summary_rows[stat_cols].agg(['sum', 'mean', 'min', 'max'])
                                 
                                 st.write(f"Total DSAs with NO ONBOARDING: {summary_rows['dsa_mobile'].nunique()}")
-                                st.write(f"Total NO ONBOARDING Customers: {int(summary_rows['Customer Count'].sum())}")
-                                st.write(f"Total Tickets Purchased: {int(summary_rows['Ticket Count'].sum())}")
-                                st.write(f"Total Scans Completed: {int(summary_rows['Scan To Send Count'].sum())}")
-                                st.write(f"Average Payment per DSA: GMD {float(summary_rows['Payment'].mean()):,.2f}")
+                                st.write(f"Total NO ONBOARDING Customers: {int(stats.at['sum', 'Customer Count'])}")
+                                st.write(f"Total Tickets Purchased: {int(stats.at['sum', 'Ticket Count'])}")
+                                st.write(f"Total Scans Completed: {int(stats.at['sum', 'Scan To Send Count'])}")
+                                st.write(f"Average Payment per DSA: GMD {float(stats.at['mean', 'Payment']):,.2f}")
                         
                         with col2:
                             st.markdown("**Payment Summary**")
                             if not summary_rows.empty:
-                                st.write(f"Total Payment (GMD): GMD {float(summary_rows['Payment'].sum()):,.2f}")
-                                st.write(f"Minimum Payment: GMD {float(summary_rows['Payment'].min()):,.2f}")
-                                st.write(f"Maximum Payment: GMD {float(summary_rows['Payment'].max()):,.2f}")
-                                st.write(f"Average Customers per DSA: {float(summary_rows['Customer Count'].mean()):.1f}")
+                                st.write(f"Total Payment (GMD): GMD {float(stats.at['sum', 'Payment']):,.2f}")
+                                st.write(f"Minimum Payment: GMD {float(stats.at['min', 'Payment']):,.2f}")
+                                st.write(f"Maximum Payment: GMD {float(stats.at['max', 'Payment']):,.2f}")
+                                st.write(f"Average Customers per DSA: {float(stats.at['mean', 'Customer Count']):.1f}")
             else:
                 st.info("Report 2 data not available or empty.")
         
@@ -1963,7 +1828,7 @@ def main():
                     display_df[col] = display_df[col].apply(lambda x: f"GMD {x:,.2f}" if pd.notna(x) and not isinstance(x, str) else x)
                 
                 # Display the table with special styling for the Total row
-                st.dataframe(display_df, use_container_width=True)
+                st.dataframe(dataframe_to_arrow(display_df), use_container_width=True)
                 
                 # Add summary statistics
                 with st.expander("View Payment Statistics"):
@@ -2048,10 +1913,13 @@ def main():
                 
                 if len(filtered_payment_report) > 1:  # Excluding Total row
                     # Exclude the Total row for visualizations
-                    viz_data = filtered_payment_report[filtered_payment_report['DSA_Mobile'] != 'Total'].copy()
+                    viz_data = filtered_payment_report.loc[
+                        filtered_payment_report['DSA_Mobile'] != 'Total',
+                        ['DSA_Mobile', 'Payment for Qualified Customers', 'Payment for not onboarded Customers', 'Total Amount Payable']
+                    ]
                     
                     if not viz_data.empty:
-                        # Create visualization for top earners
+                        # Create visualization for top earners (numeric column, so nlargest is a partial selection)
                         viz_data_sorted = viz_data.nlargest(15, 'Total Amount Payable')
                         
                         fig_payment = go.Figure()
@@ -2104,12 +1972,10 @@ def main():
                     
                     # Create Excel file for Report 1
                     if "qualified_customers" in filtered_report_1 and not filtered_report_1["qualified_customers"].empty:
-                        output_1 = BytesIO()
-                        with pd.ExcelWriter(output_1, engine='openpyxl') as writer:
-                            filtered_report_1["qualified_customers"].to_excel(writer, index=False, sheet_name="Qualified_Customers")
-                            if "dsa_summary" in filtered_report_1 and not filtered_report_1["dsa_summary"].empty:
-                                filtered_report_1["dsa_summary"].to_excel(writer, index=False, sheet_name="DSA_Summary")
-                        output_1.seek(0)
+                        sheets_1 = [("Qualified_Customers", filtered_report_1["qualified_customers"])]
+                        if "dsa_summary" in filtered_report_1 and not filtered_report_1["dsa_summary"].empty:
+                            sheets_1.append(("DSA_Summary", filtered_report_1["dsa_summary"]))
+                        output_1 = dataframes_to_excel_bytes(tuple(sheets_1))
                         
                         st.download_button(
                             label="📥 Download Report 1 (Excel)",
@@ -2120,7 +1986,7 @@ def main():
                     
                     # CSV download for qualified customers
                     if "qualified_customers" in filtered_report_1 and not filtered_report_1["qualified_customers"].empty:
-                        csv_1 = filtered_report_1["qualified_customers"].to_csv(index=False).encode('utf-8')
+                        csv_1 = dataframe_to_csv_bytes(filtered_report_1["qualified_customers"])
                         st.download_button(
                             label="📥 Download Qualified Customers (CSV)",
                             data=csv_1,
@@ -2133,10 +1999,7 @@ def main():
                     st.markdown("#### Report 2: NO ONBOARDING Analysis")
                     
                     # Create Excel file for Report 2
-                    output_2 = BytesIO()
-                    with pd.ExcelWriter(output_2, engine='openpyxl') as writer:
-                        filtered_report_2["report_2_results"].to_excel(writer, index=False, sheet_name="NO_ONBOARDING_Analysis")
-                    output_2.seek(0)
+                    output_2 = dataframes_to_excel_bytes((("NO_ONBOARDING_Analysis", filtered_report_2["report_2_results"]),))
                     
                     st.download_button(
                         label="📥 Download Report 2 (Excel)",
@@ -2146,7 +2009,7 @@ def main():
                     )
                     
                     # CSV download
-                    csv_2 = filtered_report_2["report_2_results"].to_csv(index=False, sep='\t').encode('utf-8')
+                    csv_2 = dataframe_to_csv_bytes(filtered_report_2["report_2_results"], sep='\t')
                     st.download_button(
                         label="📥 Download Analysis (CSV)",
                         data=csv_2,
@@ -2159,10 +2022,7 @@ def main():
                     st.markdown("#### Payment Report")
                     
                     # Create Excel file for Payment report
-                    output_payment = BytesIO()
-                    with pd.ExcelWriter(output_payment, engine='openpyxl') as writer:
-                        filtered_payment_report.to_excel(writer, index=False, sheet_name="Payment_Report")
-                    output_payment.seek(0)
+                    output_payment = dataframes_to_excel_bytes((("Payment_Report", filtered_payment_report),))
                     
                     st.download_button(
                         label="📥 Download Payment Report (Excel)",
@@ -2172,7 +2032,7 @@ def main():
                     )
                     
                     # CSV download
-                    csv_payment = filtered_payment_report.to_csv(index=False).encode('utf-8')
+                    csv_payment = dataframe_to_csv_bytes(filtered_payment_report)
                     st.download_button(
                         label="📥 Download Payment Report (CSV)",
                         data=csv_payment,
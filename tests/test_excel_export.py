@@ -0,0 +1,47 @@
+from datetime import date
+from io import BytesIO
+
+import pandas as pd
+
+import dsa_dashboard as dash
+
+
+def csv_bytes(rows):
+    return pd.DataFrame(rows).to_csv(index=False).encode('utf-8')
+
+
+def test_master_excel_export_with_utc_timestamps():
+    """ISO timestamps with a Z suffix must not stop the master workbook from being written"""
+    onboarding_df = dash.load_csv(csv_bytes([
+        {"Mobile": "7001000", "Full Name": "Cust A", "Customer Referrer Mobile": "7000050",
+         "Status": "Active", "Registration Date": "2024-06-26T09:00:00Z"},
+    ]))
+    ticket_df = dash.normalize_ticket_schema(dash.load_csv(csv_bytes([
+        {"User Identifier": "7001000", "Entity Name": "Customer", "Transaction Type": "DR",
+         "Amount": "100", "Created At": "2024-06-26T10:00:00Z"},
+    ])))
+    deposit_df = dash.load_csv(csv_bytes([
+        {"User Identifier": "7001000", "Full Name": "Cust A", "Transaction Type": "CR",
+         "Amount": "500", "Created By": "7000050", "Created At": "2024-06-26T11:00:00Z"},
+        {"User Identifier": "7002000", "Full Name": "Cust B", "Transaction Type": "CR",
+         "Amount": "500", "Created By": "7000050", "Created At": "2024-06-26T11:30:00Z"},
+    ]))
+    scan_df = dash.load_csv(csv_bytes([
+        {"Created By": "7001000", "Transaction Type": "DR", "Amount": "10",
+         "Created At": "2024-06-26T12:00:00Z"},
+    ]))
+    assert ticket_df["Created At"].dt.tz is None
+
+    report_1 = dash.process_report_1(onboarding_df, ticket_df, pd.DataFrame(), deposit_df, scan_df,
+                                     start_date=date(2024, 6, 1), end_date=date(2024, 6, 30))
+    report_2 = dash.process_report_2(onboarding_df, deposit_df, ticket_df, scan_df,
+                                     start_date=date(2024, 6, 1), end_date=date(2024, 6, 30),
+                                     report_1_qualified_customers=report_1["qualified_customers"])
+    payment_report = dash.generate_payment_report(report_1, report_2)
+
+    workbook = dash.create_master_excel_report(report_1, report_2, payment_report)
+    assert workbook is not None
+
+    sheets = pd.read_excel(BytesIO(workbook), sheet_name=None)
+    ticket_dates = pd.to_datetime(sheets["Report1_Ticket_Details"]["Created At"])
+    assert list(ticket_dates) == [pd.Timestamp("2024-06-26 10:00:00")]
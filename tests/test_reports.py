@@ -0,0 +1,170 @@
+from datetime import date
+
+import pandas as pd
+
+import dsa_dashboard as dash
+
+
+def csv_frame(columns, rows):
+    """Read rows through load_csv, as an upload would be (a header-only file when there are no rows)"""
+    return dash.load_csv(pd.DataFrame(rows, columns=columns).to_csv(index=False).encode('utf-8'))
+
+
+def onboarding(*customers):
+    return csv_frame(
+        ["Mobile", "Full Name", "Customer Referrer Mobile", "Status", "Registration Date"],
+        [(mobile, f"Cust {mobile}", dsa, "Active", "2024-06-01") for mobile, dsa in customers],
+    )
+
+
+def tickets(*mobiles, entity="Customer"):
+    return dash.normalize_ticket_schema(csv_frame(
+        ["User Identifier", "Entity Name", "Transaction Type", "Amount", "Created At"],
+        [(mobile, entity, "DR", "100", "2024-06-02") for mobile in mobiles],
+    ))
+
+
+def deposits(*rows):
+    return csv_frame(
+        ["User Identifier", "Full Name", "Transaction Type", "Amount", "Created By", "Created At"],
+        [(mobile, f"Cust {mobile}", "CR", "500", dsa, "2024-06-02") for mobile, dsa in rows],
+    )
+
+
+def scans(*mobiles):
+    return csv_frame(
+        ["Created By", "Transaction Type", "Amount", "Created At"],
+        [(mobile, "DR", "10", "2024-06-02") for mobile in mobiles],
+    )
+
+
+def run_report_1(onboarding_df, ticket_df, deposit_df, scan_df, **dates):
+    report = dash.process_report_1(onboarding_df, ticket_df, pd.DataFrame(), deposit_df, scan_df, **dates)
+    assert report is not None
+    return report
+
+
+def test_report_1_single_customer():
+    report = run_report_1(onboarding(("7001000", "7000050")), tickets("7001000"),
+                          deposits(("7001000", "7000050")), scans("7001000"))
+    qualified = report["qualified_customers"]
+    assert list(qualified["customer_mobile"].astype(str)) == ["7001000"]
+    row = qualified.iloc[0]
+    assert (row["bought_ticket"], row["did_scan"], row["deposited"]) == (1, 1, 1)
+    assert (row["ticket_amount"], row["scan_amount"]) == (100.0, 10.0)
+    assert row["Customer Count"] == 1
+    assert row["Payment (Customer Count *40)"] == 40
+
+
+def test_report_1_customers_who_all_bought_tickets():
+    # Every onboarded customer has a ticket, so the ticket lookup maps the customers one-to-one
+    report = run_report_1(onboarding(("7001000", "7000050"), ("7001001", "7000050")),
+                          tickets("7001000", "7001001"),
+                          deposits(("7001000", "7000050"), ("7001001", "7000050")),
+                          scans("7009999"))
+    qualified = report["qualified_customers"]
+    assert sorted(qualified["customer_mobile"].astype(str)) == ["7001000", "7001001"]
+    assert qualified["bought_ticket"].tolist() == [1, 1]
+    assert qualified["did_scan"].tolist() == [0, 0]
+    assert qualified["Customer Count"].iloc[0] == 2
+
+
+def test_report_1_without_ticket_rows_after_filtering():
+    report = run_report_1(onboarding(("7001000", "7000050")), tickets("7001000", entity="Merchant"),
+                          deposits(("7001000", "7000050")), scans("7001000"))
+    row = report["qualified_customers"].iloc[0]
+    assert (row["bought_ticket"], row["ticket_amount"], row["did_scan"]) == (0, 0.0, 1)
+
+
+def test_report_1_date_range_without_rows():
+    report = run_report_1(onboarding(("7001000", "7000050")), tickets("7001000"),
+                          deposits(("7001000", "7000050")), scans("7001000"),
+                          start_date=date(2023, 1, 1), end_date=date(2023, 1, 31))
+    assert report["qualified_customers"].empty
+    assert report["onboarded_customers"].empty
+
+
+def test_report_1_without_referrer_column_keeps_unknown_dsa():
+    onboarding_df = onboarding(("7001000", "7000050")).drop(columns=["Customer Referrer Mobile"])
+    report = run_report_1(onboarding_df, tickets("7001000"), deposits(("7001000", "7000050")), scans("7001000"))
+    qualified = report["qualified_customers"]
+    assert list(qualified["dsa_mobile"].astype(str)) == ["Unknown"]
+    assert list(qualified["customer_mobile"].astype(str)) == ["7001000"]
+
+
+def test_load_csv_names_duplicate_and_blank_headers_like_the_default_parser():
+    df = dash.load_csv(b"Mobile,Mobile,,Amount,Mobile.1\n7001000,7001001,x,100,7001002\n")
+    assert list(df.columns) == ["Mobile", "Mobile.2", "Unnamed: 2", "Amount", "Mobile.1"]
+    assert dash.find_column(df, ["Mobile"]) == "Mobile"
+
+
+def test_report_1_empty_uploads():
+    report = run_report_1(onboarding(), tickets(), deposits(), scans())
+    assert report["qualified_customers"].empty
+    assert report["dsa_summary"].empty
+
+
+def test_report_1_summary_counts_per_dsa():
+    report = run_report_1(
+        onboarding(("7001000", "7000050"), ("7001001", "7000050"), ("7001002", "7000060")),
+        tickets("7001000", "7001002"),
+        deposits(("7001000", "7000050"), ("7001001", "7000050"), ("7001002", "7000060")),
+        scans("7001001"),
+    )
+    qualified = report["qualified_customers"]
+    summary_cols = ["Customer Count", "Deposit Count", "Ticket Count", "Scan To Send Count",
+                    "Payment (Customer Count *40)"]
+    assert all(qualified[col].dtype == "Int32" for col in summary_cols)
+    # Summaries sit on each DSA's first row only
+    summary_rows = qualified[qualified["Customer Count"].notna()]
+    by_dsa = {str(row["dsa_mobile"]): tuple(int(row[col]) for col in summary_cols)
+              for _, row in summary_rows.iterrows()}
+    assert by_dsa == {"7000050": (2, 2, 1, 1, 80), "7000060": (1, 1, 1, 0, 40)}
+    assert qualified["Customer Count"].isna().sum() == 1
+
+    dsa_summary = report["dsa_summary"].set_index(report["dsa_summary"]["dsa_mobile"].astype(str))
+    assert dsa_summary.loc["7000050", "Customer_Count"] == 2
+    assert dsa_summary.loc["7000060", "Customer_Count"] == 1
+
+
+def run_report_2(onboarding_df, deposit_df, ticket_df, scan_df):
+    report_1 = run_report_1(onboarding_df, ticket_df, deposit_df, scan_df)
+    report = dash.process_report_2(onboarding_df, deposit_df, ticket_df, scan_df,
+                                   report_1_qualified_customers=report_1["qualified_customers"])
+    assert report is not None
+    return report["report_2_results"]
+
+
+def test_report_2_empty_uploads():
+    results = run_report_2(onboarding(), deposits(), tickets(), scans())
+    assert results.empty
+
+
+def test_report_2_single_customer():
+    results = run_report_2(onboarding(("7001000", "7000050")),
+                           deposits(("7002000", "7000060")), tickets("7002000"), scans())
+    # One customer row followed by the blank separator row
+    assert len(results) == 2
+    customer, separator = results.iloc[0], results.iloc[1]
+    assert (str(customer["dsa_mobile"]), customer["customer_mobile"]) == ("7000060", "7002000")
+    assert customer["match_status"] == "NO ONBOARDING"
+    assert (customer["bought_ticket"], customer["did_scan"], customer["deposited"]) == (1, 0, 1)
+    assert (customer["Customer Count"], customer["Payment"]) == (1, 25)
+    assert separator[["bought_ticket", "did_scan", "deposited", "Customer Count", "Payment"]].isna().all()
+
+
+def test_report_2_counts_and_exclusions():
+    # 7001000 is onboarded (and qualifies for Report 1), so only the two other customers are listed
+    results = run_report_2(
+        onboarding(("7001000", "7000050")),
+        deposits(("7001000", "7000050"), ("7002000", "7000060"), ("7002001", "7000060")),
+        tickets("7001000", "7002000"),
+        scans("7002001"),
+    )
+    count_cols = ["bought_ticket", "did_scan", "deposited", "Customer Count", "Deposit Count",
+                  "Ticket Count", "Scan To Send Count", "Payment"]
+    assert all(results[col].dtype == "Int32" for col in count_cols)
+    customers = results[results["customer_mobile"].notna() & (results["customer_mobile"] != "")]
+    assert sorted(customers["customer_mobile"]) == ["7002000", "7002001"]
+    summary = customers[customers["Customer Count"].notna()].iloc[0]
+    assert tuple(int(summary[col]) for col in count_cols[3:]) == (2, 2, 1, 1, 50)